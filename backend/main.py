@@ -9,6 +9,7 @@ import logging
 import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from routers import upload, health, insights, question_suggestions, chat, mappings
@@ -41,6 +42,7 @@ app = FastAPI(
     description="Story-first data understanding API. Rules decide, AI explains.",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson: faster encoding of large result payloads
 )
 
 # CORS configuration
@@ -15,7 +15,7 @@ import logging
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 
-from services.query_generation import QueryGenerationRequest, generate_query
+from services.query_generation import QueryGenerationRequest, generate_query_async
 from services.query_validation import validate_query
 from services.query_execution import execute_query
 from services.semantic_resolution import resolve_semantics
@@ -111,7 +111,7 @@ async def execute_question(dataset_id: str, request: Dict[str, Any]) -> Dict[str
     
     if required_unmapped_concepts:
         # Trigger column-mapping UI immediately and stop processing
-        first_unmapped = sorted(required_unmapped_concepts)[0]  # Get first unmapped concept
+        first_unmapped = min(required_unmapped_concepts)  # Get first unmapped concept
         return {
             "dataset_id": dataset_id,
             "result": {
@@ -134,7 +134,7 @@ async def execute_question(dataset_id: str, request: Dict[str, Any]) -> Dict[str
         # Check if it's a subjective question (no missing concepts) or mapping request
         if semantic_result.missing_concepts:
             # Need user to provide column mappings - return structured type
-            first_missing = sorted(semantic_result.missing_concepts)[0]  # Ask for one at a time
+            first_missing = min(semantic_result.missing_concepts)  # Ask for one at a time
             return {
                 "dataset_id": dataset_id,
                 "result": {
@@ -178,7 +178,7 @@ async def execute_question(dataset_id: str, request: Dict[str, Any]) -> Dict[str
             semantic_mappings=all_mappings  # Use all mappings (existing + newly resolved)
         )
         
-        query_response = generate_query(query_request)
+        query_response = await generate_query_async(query_request)
         
         # Log generated query
         logger.info(f"Generated query type: {query_response.query_type}, confidence: {query_response.confidence}")
@@ -234,7 +234,12 @@ async def execute_question(dataset_id: str, request: Dict[str, Any]) -> Dict[str
         }
     
     # Step 3: Validate query
-    validation_result = validate_query(query, column_names, table_name="data")
+    validation_result = validate_query(
+        query,
+        column_names,
+        table_name="data",
+        column_types={col["name"]: col.get("dtype", "text") for col in columns if col.get("name")},
+    )
     
     if not validation_result.is_valid:
         logger.warning(f"Query validation failed: {validation_result.error_message}")
@@ -49,7 +49,9 @@ async def get_health_check(dataset_id: str):
         raise HTTPException(status_code=404, detail="Data file not found")
     
     try:
-        # Load the DataFrame
+        # Load the DataFrame (version first: if the file is replaced mid-read,
+        # the coercions land under the stale version and are never reused)
+        data_version = storage.get_file_version(dataset_id, data_file.name)
         with open(data_file, "rb") as f:
             content = f.read()
         df = get_dataframe_from_bytes(content, data_file.name)
@@ -58,7 +60,8 @@ async def get_health_check(dataset_id: str):
         result = run_health_check(
             df=df,
             dataset_id=dataset_id,
-            column_profiles=profile.get("columns", [])
+            column_profiles=profile.get("columns", []),
+            data_version=data_version
         )
         
         # Convert to dict and cache
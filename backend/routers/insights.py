@@ -49,6 +49,9 @@ async def get_insights(dataset_id: str) -> InsightResult:
         raise HTTPException(status_code=404, detail="Data file not found")
 
     try:
+        # Version first: if the file is replaced mid-read, the shared
+        # coercions land under the stale version and are never reused
+        data_version = storage.get_file_version(dataset_id, data_file.name)
         with open(data_file, "rb") as f:
             content = f.read()
 
@@ -59,6 +62,7 @@ async def get_insights(dataset_id: str) -> InsightResult:
             df=df,
             profile=profile,
             health=health,
+            data_version=data_version,
         )
         return result
 
@@ -1,11 +1,19 @@
 """File upload router."""
 
+import os
+
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 
 from models.schemas import UploadResponse, DatasetProfile, ErrorResponse
 from services.storage import storage
-from services.analyzer import analyze_dataframe, get_dataframe_from_bytes, generate_id
+from services.analyzer import (
+    analyze_dataframe,
+    get_dataframe_from_stream,
+    generate_id,
+    dataframe_to_parquet,
+    PARQUET_FILENAME,
+)
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
@@ -40,11 +48,14 @@ async def upload_dataset(file: UploadFile = File(...)):
     # Validate file
     validate_file(file)
     
-    # Read file content
-    content = await file.read()
+    # Measure the spooled upload without reading it into memory
+    upload = file.file
+    upload.seek(0, os.SEEK_END)
+    file_size = upload.tell()
+    upload.seek(0)
     
     # Check file size
-    if len(content) > MAX_FILE_SIZE:
+    if file_size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
@@ -54,8 +65,8 @@ async def upload_dataset(file: UploadFile = File(...)):
     session_id = generate_id()
     
     try:
-        # Parse the file into a DataFrame
-        df = get_dataframe_from_bytes(content, file.filename or "data.csv")
+        # Parse the file into a DataFrame (straight from the upload stream)
+        df = get_dataframe_from_stream(upload, file.filename or "data.csv")
         
         # Analyze the DataFrame
         profile = analyze_dataframe(df, file.filename or "data.csv")
@@ -63,8 +74,14 @@ async def upload_dataset(file: UploadFile = File(...)):
         # Update the dataset ID to match session
         profile["dataset"]["id"] = session_id
         
-        # Save the raw file temporarily
-        storage.save_file(session_id, file.filename or "data.csv", content)
+        # Save the raw file temporarily (streamed in chunks)
+        upload.seek(0)
+        storage.save_stream(session_id, file.filename or "data.csv", upload)
+        
+        # Save a typed columnar copy so queries don't re-parse the raw file
+        parquet_bytes = dataframe_to_parquet(df)
+        if parquet_bytes:
+            storage.save_file(session_id, PARQUET_FILENAME, parquet_bytes)
         
         # Save the profile as JSON (this is what we'll use, not raw data)
         storage.save_json(session_id, "profile", profile)
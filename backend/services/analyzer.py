@@ -3,10 +3,17 @@
 import io
 import pandas as pd
 from pathlib import Path
-from typing import Literal, Optional
+from typing import BinaryIO, Literal, Optional
 from datetime import datetime
 import uuid
 
+from services.storage import storage
+
+
+# Columnar copy of the parsed upload, stored alongside the raw file so later
+# queries can skip re-parsing CSV/Excel bytes.
+PARQUET_FILENAME = "data.parquet"
+
 
 def generate_id() -> str:
     """Generate a unique session/dataset ID."""
@@ -97,7 +104,7 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def find_best_sheet(excel_file: io.BytesIO) -> tuple[str, pd.DataFrame]:
+def find_best_sheet(excel_file: BinaryIO) -> tuple[str, pd.DataFrame]:
     """
     Find the sheet with the most data in an Excel file.
     Returns (sheet_name, dataframe).
@@ -140,15 +147,15 @@ def detect_header_row(df: pd.DataFrame) -> int:
     Returns the row index (0-based).
     """
     # Look at first 10 rows to find the header
-    for i in range(min(10, len(df))):
-        row = df.iloc[i]
+    # (plain tuples per row instead of a Series from df.iloc[i])
+    for i, row in enumerate(df.head(10).itertuples(index=False, name=None)):
+        non_null = [v for v in row if not pd.isna(v)]
         
         # Skip rows with too many nulls
-        if row.isna().sum() > len(row) / 2:
+        if len(row) - len(non_null) > len(row) / 2:
             continue
         
         # Check if row looks like headers (mostly strings, unique values)
-        non_null = row.dropna()
         if len(non_null) == 0:
             continue
         
@@ -156,7 +163,7 @@ def detect_header_row(df: pd.DataFrame) -> int:
         string_count = sum(1 for v in non_null if isinstance(v, str))
         if string_count >= len(non_null) * 0.7:
             # Check for unique values (headers should be unique)
-            if len(non_null.unique()) == len(non_null):
+            if len(set(non_null)) == len(non_null):
                 return i
     
     return 0  # Default to first row
@@ -237,30 +244,39 @@ def load_file_to_dataframe(file_path: Path) -> pd.DataFrame:
 
 def get_dataframe_from_bytes(content: bytes, filename: str) -> pd.DataFrame:
     """Load a DataFrame from file bytes with smart parsing."""
+    return get_dataframe_from_stream(io.BytesIO(content), filename)
+
+
+def get_dataframe_from_stream(stream: BinaryIO, filename: str) -> pd.DataFrame:
+    """
+    Load a DataFrame from a seekable binary stream with smart parsing.
+    
+    Reads straight from the stream (e.g. an upload's spooled file), so the
+    raw file never needs to be held in memory as one bytes object.
+    """
     suffix = Path(filename).suffix.lower()
     
     if suffix == ".csv":
         # Try different encodings
         for encoding in ["utf-8", "latin-1", "cp1252"]:
             try:
-                df = pd.read_csv(io.BytesIO(content), encoding=encoding)
+                stream.seek(0)
+                df = pd.read_csv(stream, encoding=encoding)
                 return clean_dataframe(df)
             except UnicodeDecodeError:
                 continue
         raise ValueError("Could not decode CSV file with supported encodings")
     
     elif suffix in [".xlsx", ".xls"]:
-        buffer = io.BytesIO(content)
-        
         # Find the best sheet (one with most data)
-        sheet_name, raw_df = find_best_sheet(buffer)
+        sheet_name, raw_df = find_best_sheet(stream)
         
         # Detect header row
         header_row = detect_header_row(raw_df)
         
         # Re-read with proper header
-        buffer.seek(0)
-        df = pd.read_excel(buffer, sheet_name=sheet_name, header=header_row)
+        stream.seek(0)
+        df = pd.read_excel(stream, sheet_name=sheet_name, header=header_row)
         
         # Clean the dataframe
         df = clean_dataframe(df)
@@ -269,3 +285,34 @@ def get_dataframe_from_bytes(content: bytes, filename: str) -> pd.DataFrame:
     
     else:
         raise ValueError(f"Unsupported file type: {suffix}")
+
+
+def dataframe_to_parquet(df: pd.DataFrame) -> Optional[bytes]:
+    """
+    Serialize a parsed DataFrame to Parquet bytes.
+    
+    Returns None if the frame cannot be represented in Parquet
+    (e.g., object columns with mixed value types).
+    """
+    try:
+        return df.to_parquet(index=False)
+    except Exception:
+        return None
+
+
+def load_dataset_dataframe(dataset_id: str, dataset_name: str) -> pd.DataFrame:
+    """
+    Load a stored dataset as a DataFrame.
+    
+    Prefers the Parquet copy written at upload time (already typed, no text
+    parsing) and falls back to parsing the original file.
+    """
+    parquet_bytes = storage.get_file(dataset_id, PARQUET_FILENAME)
+    if parquet_bytes:
+        return pd.read_parquet(io.BytesIO(parquet_bytes))
+    
+    dataset_bytes = storage.get_file(dataset_id, dataset_name)
+    if not dataset_bytes:
+        raise ValueError(f"Dataset file {dataset_name} not found for dataset {dataset_id}")
+    
+    return get_dataframe_from_bytes(dataset_bytes, dataset_name)
@@ -13,7 +13,8 @@ This service:
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from models.intent import (
@@ -27,11 +28,61 @@ from models.intent import (
 )
 from services.health_check import classify_column_role
 from services.storage import storage
-from services.analyzer import get_dataframe_from_bytes
+from services.analyzer import load_dataset_dataframe
 
 
 # === Deterministic Column Selection ===
 
+# Upper bound on threads used to score candidate columns concurrently
+MAX_SCORING_WORKERS = 8
+
+
+def _score_metric_column(series: pd.Series) -> float:
+    """Variance score for a metric column (prefers non-constant distributions)."""
+    try:
+        # Only coerce when needed; numeric dtypes are scored as-is
+        if pd.api.types.is_numeric_dtype(series):
+            numeric_col = series
+        else:
+            numeric_col = pd.to_numeric(series, errors="coerce")
+        if numeric_col.notna().sum() > 0:
+            variance = numeric_col.var()
+            return min(1.0, variance / (numeric_col.max() - numeric_col.min() + 1e-10))
+        return 0.0
+    except Exception:
+        return 0.0
+
+
+def _score_timestamp_column(series: pd.Series, total_rows: int) -> float:
+    """Score a timestamp column by date range width and validity."""
+    try:
+        date_col = pd.to_datetime(series, errors="coerce")
+        valid_dates = date_col.notna().sum()
+        if valid_dates > 0:
+            date_range = (date_col.max() - date_col.min()).days
+            range_score = min(1.0, date_range / 3650)  # Normalize to ~10 years
+            validity_score = valid_dates / total_rows
+            return range_score * 0.6 + validity_score * 0.4
+        return 0.0
+    except Exception:
+        return 0.0
+
+
+def _map_column_scores(score_fn, series_list: List[pd.Series]) -> List[float]:
+    """
+    Apply a per-column scoring function to each series.
+    
+    Columns are independent and the heavy lifting (numeric/datetime
+    coercion, reductions) runs in pandas/numpy C code that releases the
+    GIL, so several candidates are scored on a thread pool.
+    """
+    if len(series_list) <= 1:
+        return [score_fn(series) for series in series_list]
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_SCORING_WORKERS, len(series_list))) as executor:
+        return list(executor.map(score_fn, series_list))
+
+
 def select_best_column_by_role(
     df: pd.DataFrame,
     column_profiles: List[Dict],
@@ -48,7 +99,7 @@ def select_best_column_by_role(
     
     Returns the first column after stable sorting, or None if no suitable column.
     """
-    candidates = []
+    eligible = []
     total_rows = len(df)
     
     for col in df.columns:
@@ -72,46 +123,42 @@ def select_best_column_by_role(
             continue
         
         null_pct = (null_count / total_rows * 100) if total_rows > 0 else 0
-        
-        # Calculate score based on role
-        if role == "dimension":
-            # Prefer: low null %, moderate cardinality (10-50% unique)
-            cardinality_score = 1.0 - abs(unique_ratio - 0.3)  # Prefer ~30% unique
-            score = (1.0 - null_pct / 100) * 0.7 + cardinality_score * 0.3
-        elif role == "metric":
-            # Prefer: low null %, non-constant (has variance)
-            try:
-                numeric_col = pd.to_numeric(df[col], errors="coerce")
-                if numeric_col.notna().sum() > 0:
-                    variance = numeric_col.var()
-                    variance_score = min(1.0, variance / (numeric_col.max() - numeric_col.min() + 1e-10))
-                else:
-                    variance_score = 0.0
-            except:
-                variance_score = 0.0
-            score = (1.0 - null_pct / 100) * 0.6 + variance_score * 0.4
-        elif role == "timestamp":
-            # Prefer: widest date range, fewest invalid dates
-            try:
-                date_col = pd.to_datetime(df[col], errors="coerce")
-                valid_dates = date_col.notna().sum()
-                if valid_dates > 0:
-                    date_range = (date_col.max() - date_col.min()).days
-                    range_score = min(1.0, date_range / 3650)  # Normalize to ~10 years
-                    validity_score = valid_dates / total_rows
-                    score = range_score * 0.6 + validity_score * 0.4
-                else:
-                    score = 0.0
-            except:
-                score = 0.0
-        else:
-            score = 1.0 - null_pct / 100
-        
-        candidates.append((col_str, score, null_pct))
+        eligible.append((col, col_str, null_pct, unique_ratio))
     
-    if not candidates:
+    if not eligible:
         return None
     
+    # Calculate score based on role
+    if role == "dimension":
+        # Prefer: low null %, moderate cardinality (10-50% unique)
+        scores = [
+            (1.0 - null_pct / 100) * 0.7 + (1.0 - abs(unique_ratio - 0.3)) * 0.3  # Prefer ~30% unique
+            for _, _, null_pct, unique_ratio in eligible
+        ]
+    elif role == "metric":
+        # Prefer: low null %, non-constant (has variance)
+        variance_scores = _map_column_scores(
+            _score_metric_column,
+            [df[col] for col, _, _, _ in eligible],
+        )
+        scores = [
+            (1.0 - null_pct / 100) * 0.6 + variance_score * 0.4
+            for (_, _, null_pct, _), variance_score in zip(eligible, variance_scores)
+        ]
+    elif role == "timestamp":
+        # Prefer: widest date range, fewest invalid dates
+        scores = _map_column_scores(
+            lambda series: _score_timestamp_column(series, total_rows),
+            [df[col] for col, _, _, _ in eligible],
+        )
+    else:
+        scores = [1.0 - null_pct / 100 for _, _, null_pct, _ in eligible]
+    
+    candidates = [
+        (col_str, score, null_pct)
+        for (_, col_str, null_pct, _), score in zip(eligible, scores)
+    ]
+    
     # Sort by score (descending), then by null_pct (ascending), then by name (stable)
     candidates.sort(key=lambda x: (-x[1], x[2], x[0]))
     
@@ -142,6 +189,143 @@ def get_columns_by_role(
     return matching
 
 
+# === Time Bucketing ===
+
+# Granularities bucketed via integer period codes rather than Period objects
+PERIOD_GRANULARITIES = ("week", "month", "quarter")
+
+# 1970-01-01 is a Thursday; shifting by 3 days aligns week codes to
+# Monday-start weeks, matching pandas' default "W" periods.
+_EPOCH_WEEK_OFFSET_DAYS = 3
+
+
+def _period_codes(ts: pd.Series, granularity: str) -> np.ndarray:
+    """
+    Map datetimes to int64 period codes for grouping.
+    
+    Integer keys hash far faster than Period objects or strings; only the
+    aggregated keys are converted back to labels (see _period_labels).
+    """
+    if granularity == "week":
+        days = ts.values.astype("datetime64[D]").astype(np.int64)
+        return (days + _EPOCH_WEEK_OFFSET_DAYS) // 7
+    
+    years = ts.dt.year.to_numpy(dtype=np.int64)
+    if granularity == "month":
+        return years * 12 + ts.dt.month.to_numpy(dtype=np.int64) - 1
+    if granularity == "quarter":
+        return years * 4 + ts.dt.quarter.to_numpy(dtype=np.int64) - 1
+    
+    raise ValueError(f"Unsupported period granularity: {granularity}")
+
+
+def _period_labels(codes: List[int], granularity: str) -> List[str]:
+    """Render period codes in the same format as str(pd.Period)."""
+    if granularity == "week":
+        labels = []
+        for code in codes:
+            start = np.datetime64(code * 7 - _EPOCH_WEEK_OFFSET_DAYS, "D")
+            labels.append(f"{start}/{start + np.timedelta64(6, 'D')}")
+        return labels
+    if granularity == "month":
+        return [f"{code // 12}-{code % 12 + 1:02d}" for code in codes]
+    if granularity == "quarter":
+        return [f"{code // 4}Q{code % 4 + 1}" for code in codes]
+    
+    raise ValueError(f"Unsupported period granularity: {granularity}")
+
+
+# Granularity → bucketing function (unknown/None falls back to "day")
+_GRANULARITY_BUCKETS = {
+    "day": lambda ts: ts.dt.date,
+    "week": lambda ts: _period_codes(ts, "week"),
+    "month": lambda ts: _period_codes(ts, "month"),
+    "quarter": lambda ts: _period_codes(ts, "quarter"),
+    "year": lambda ts: ts.dt.year,
+}
+
+
+def _time_bucket(ts: pd.Series, granularity: Optional[str]):
+    """Bucket a datetime series into group keys for the given granularity."""
+    bucket_fn = _GRANULARITY_BUCKETS.get(granularity, _GRANULARITY_BUCKETS["day"])
+    return bucket_fn(ts)
+
+
+def _label_time_buckets(aggregated: pd.Series, granularity: Optional[str]) -> pd.Series:
+    """Convert integer period codes in an aggregated index back to labels."""
+    if granularity in PERIOD_GRANULARITIES:
+        aggregated.index = _period_labels(aggregated.index.tolist(), granularity)
+    return aggregated
+
+
+# === Result Construction ===
+
+def _series_columns(series: pd.Series) -> Tuple[List[str], List[float]]:
+    """
+    Extract (labels, values) from an aggregated series as plain lists.
+    
+    Both conversions run as single C-level passes, replacing a per-row
+    str()/float() call when building result rows.
+    """
+    keys = series.index.astype(str).tolist()
+    values = series.to_numpy(dtype=np.float64).tolist()
+    return keys, values
+
+
+# === Grouping ===
+
+def _dimension_group_key(series: pd.Series) -> pd.Series:
+    """
+    Return a grouping key for a dimension column.
+    
+    Object columns are converted to `category` so groupby works on integer
+    codes instead of hashing Python strings. Categories come out sorted,
+    so the default sorted group order is preserved at no extra cost.
+    """
+    if series.dtype == object:
+        return series.astype("category")
+    return series
+
+
+# === Post-Processing ===
+
+def _post_process_extremum(
+    aggregated: pd.Series,
+    kind: str,
+    key_field: str,
+    extra_fields: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Build a tie-aware scalar result for the min/max of aggregated groups.
+    
+    A single winning group is reported under `key_field`; ties report ALL
+    tied groups under the plural `key_field + "s"`.
+    """
+    extremum = aggregated.min() if kind == "min" else aggregated.max()
+    # Find ALL groups tied for the extremum
+    tied_groups = aggregated[aggregated == extremum].index.tolist()
+    
+    if len(tied_groups) == 1:
+        return {
+            "type": "scalar",
+            "value": float(extremum),
+            key_field: str(tied_groups[0]),
+            **extra_fields,
+            "tied": False,
+        }
+    
+    # Multiple groups tied
+    return {
+        "type": "scalar",
+        "value": float(extremum),
+        key_field: None,
+        f"{key_field}s": [str(g) for g in tied_groups],
+        **extra_fields,
+        "tied": True,
+        "tied_count": len(tied_groups),
+    }
+
+
 # === Execution Functions ===
 
 def execute_aggregate(
@@ -215,27 +399,20 @@ def execute_aggregate(
         if not time_col:
             raise ValueError("No suitable timestamp columns found in dataset")
         
-        # Ensure datetime
-        df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
-        df = df.dropna(subset=[time_col])
+        # Project to the needed columns; the loaded frame is never mutated
+        work = df[[c for c in (time_col, metric_col) if c]]
+        
+        # Ensure datetime and drop unparseable timestamps
+        times = pd.to_datetime(work[time_col], errors="coerce")
+        valid = times.notna()
+        work = work[valid]
         
         # Apply time granularity
-        if intent.time_granularity == "day":
-            df["_time_group"] = df[time_col].dt.date
-        elif intent.time_granularity == "week":
-            df["_time_group"] = df[time_col].dt.to_period("W").astype(str)
-        elif intent.time_granularity == "month":
-            df["_time_group"] = df[time_col].dt.to_period("M").astype(str)
-        elif intent.time_granularity == "quarter":
-            df["_time_group"] = df[time_col].dt.to_period("Q").astype(str)
-        elif intent.time_granularity == "year":
-            df["_time_group"] = df[time_col].dt.year
-        else:
-            df["_time_group"] = df[time_col].dt.date
+        time_groups = _time_bucket(times[valid], intent.time_granularity)
         
         # Group and aggregate
         if metric_col:
-            grouped = df.groupby("_time_group")[metric_col]
+            grouped = work.groupby(time_groups)[metric_col]
             if agg_func == "sum":
                 aggregated = grouped.sum()
             elif agg_func == "mean":
@@ -250,68 +427,29 @@ def execute_aggregate(
                 raise ValueError(f"Unsupported aggregation: {agg_func}")
         else:
             # For count without metric, count rows per time group using size()
-            aggregated = df.groupby("_time_group").size()
+            aggregated = work.groupby(time_groups).size()
+        
+        # Convert integer period codes back to labels (only the kept groups)
+        aggregated = _label_time_buckets(aggregated, intent.time_granularity)
         
         # Post-process if needed (tie-aware)
-        if intent.post_process == "min":
-            min_value = aggregated.min()
-            # Find ALL groups tied for minimum
-            tied_groups = aggregated[aggregated == min_value].index.tolist()
-            if len(tied_groups) == 1:
-                return {
-                    "type": "scalar",
-                    "value": float(min_value),
-                    "time_period": str(tied_groups[0]),
-                    "metric_column": metric_col,
-                    "time_column": time_col,
-                    "aggregation": agg_func,
-                    "tied": False,
-                }
-            else:
-                # Multiple groups tied
-                return {
-                    "type": "scalar",
-                    "value": float(min_value),
-                    "time_period": None,
-                    "time_periods": [str(g) for g in tied_groups],
+        if intent.post_process in ("min", "max"):
+            return _post_process_extremum(
+                aggregated,
+                intent.post_process,
+                "time_period",
+                {
                     "metric_column": metric_col,
                     "time_column": time_col,
                     "aggregation": agg_func,
-                    "tied": True,
-                    "tied_count": len(tied_groups),
-                }
-        elif intent.post_process == "max":
-            max_value = aggregated.max()
-            # Find ALL groups tied for maximum
-            tied_groups = aggregated[aggregated == max_value].index.tolist()
-            if len(tied_groups) == 1:
-                return {
-                    "type": "scalar",
-                    "value": float(max_value),
-                    "time_period": str(tied_groups[0]),
-                    "metric_column": metric_col,
-                    "time_column": time_col,
-                    "aggregation": agg_func,
-                    "tied": False,
-                }
-            else:
-                # Multiple groups tied
-                return {
-                    "type": "scalar",
-                    "value": float(max_value),
-                    "time_period": None,
-                    "time_periods": [str(g) for g in tied_groups],
-                    "metric_column": metric_col,
-                    "time_column": time_col,
-                    "aggregation": agg_func,
-                    "tied": True,
-                    "tied_count": len(tied_groups),
-                }
+                },
+            )
         
         # Return time series
+        keys, values = _series_columns(aggregated)
         result_data = [
-            {"time": str(k), "value": float(v)}
-            for k, v in aggregated.items()
+            {"time": k, "value": v}
+            for k, v in zip(keys, values)
         ]
         
         return {
@@ -329,9 +467,13 @@ def execute_aggregate(
         if not dim_col:
             raise ValueError("No suitable dimension columns found in dataset")
         
-        # Group and aggregate
+        # Project to the needed columns before grouping
+        work = df[[c for c in (dim_col, metric_col) if c]]
+        
+        # Group and aggregate (observed=True: only categories present in data)
+        dim_key = _dimension_group_key(work[dim_col])
         if metric_col:
-            grouped = df.groupby(dim_col)[metric_col]
+            grouped = work.groupby(dim_key, observed=True)[metric_col]
             if agg_func == "sum":
                 aggregated = grouped.sum()
             elif agg_func == "mean":
@@ -346,68 +488,26 @@ def execute_aggregate(
                 raise ValueError(f"Unsupported aggregation: {agg_func}")
         else:
             # For count aggregation without metric, count rows per dimension
-            aggregated = df.groupby(dim_col).size()
+            aggregated = work.groupby(dim_key, observed=True).size()
         
         # Post-process if needed (tie-aware)
-        if intent.post_process == "min":
-            min_value = aggregated.min()
-            # Find ALL groups tied for minimum
-            tied_groups = aggregated[aggregated == min_value].index.tolist()
-            if len(tied_groups) == 1:
-                return {
-                    "type": "scalar",
-                    "value": float(min_value),
-                    "dimension_value": str(tied_groups[0]),
-                    "metric_column": metric_col,
-                    "dimension_column": dim_col,
-                    "aggregation": agg_func,
-                    "tied": False,
-                }
-            else:
-                # Multiple groups tied
-                return {
-                    "type": "scalar",
-                    "value": float(min_value),
-                    "dimension_value": None,
-                    "dimension_values": [str(g) for g in tied_groups],
-                    "metric_column": metric_col,
-                    "dimension_column": dim_col,
-                    "aggregation": agg_func,
-                    "tied": True,
-                    "tied_count": len(tied_groups),
-                }
-        elif intent.post_process == "max":
-            max_value = aggregated.max()
-            # Find ALL groups tied for maximum
-            tied_groups = aggregated[aggregated == max_value].index.tolist()
-            if len(tied_groups) == 1:
-                return {
-                    "type": "scalar",
-                    "value": float(max_value),
-                    "dimension_value": str(tied_groups[0]),
-                    "metric_column": metric_col,
-                    "dimension_column": dim_col,
-                    "aggregation": agg_func,
-                    "tied": False,
-                }
-            else:
-                # Multiple groups tied
-                return {
-                    "type": "scalar",
-                    "value": float(max_value),
-                    "dimension_value": None,
-                    "dimension_values": [str(g) for g in tied_groups],
+        if intent.post_process in ("min", "max"):
+            return _post_process_extremum(
+                aggregated,
+                intent.post_process,
+                "dimension_value",
+                {
                     "metric_column": metric_col,
                     "dimension_column": dim_col,
                     "aggregation": agg_func,
-                    "tied": True,
-                    "tied_count": len(tied_groups),
-                }
+                },
+            )
         
         # Return breakdown
+        keys, values = _series_columns(aggregated)
         result_data = [
-            {"dimension": str(k), "value": float(v)}
-            for k, v in aggregated.items()
+            {"dimension": k, "value": v}
+            for k, v in zip(keys, values)
         ]
         
         return {
@@ -437,8 +537,11 @@ def execute_compare(
     if not dim_col:
         raise ValueError("No suitable dimension columns found")
     
-    # Group and aggregate
-    grouped = df.groupby(dim_col)[metric_col]
+    # Project to the needed columns before grouping
+    work = df[[dim_col, metric_col]]
+    
+    # Group and aggregate (observed=True: only categories present in data)
+    grouped = work.groupby(_dimension_group_key(work[dim_col]), observed=True)[metric_col]
     
     if intent.aggregation == "sum":
         aggregated = grouped.sum()
@@ -453,14 +556,16 @@ def execute_compare(
     else:
         raise ValueError(f"Unsupported aggregation: {intent.aggregation}")
     
-    # Sort and limit
-    sorted_data = aggregated.sort_values(ascending=False)
+    # Sort and limit (partial sort when only the top N are kept)
     if intent.limit:
-        sorted_data = sorted_data.head(intent.limit)
+        sorted_data = aggregated.nlargest(intent.limit)
+    else:
+        sorted_data = aggregated.sort_values(ascending=False)
     
+    keys, values = _series_columns(sorted_data)
     result_data = [
-        {"dimension": str(k), "value": float(v)}
-        for k, v in sorted_data.items()
+        {"dimension": k, "value": v}
+        for k, v in zip(keys, values)
     ]
     
     return {
@@ -499,31 +604,24 @@ def execute_rank(
     if not group_col:
         raise ValueError(f"No suitable {intent.group_by_role} columns found")
     
+    # Project to the needed columns; the loaded frame is never mutated
+    work = df[[c for c in (group_col, metric_col) if c]]
+    
     # Handle timestamp grouping with granularity
     if intent.group_by_role == "timestamp":
-        # Ensure datetime
-        df = df.copy()
-        df[group_col] = pd.to_datetime(df[group_col], errors="coerce")
-        df = df.dropna(subset=[group_col])
+        # Ensure datetime and drop unparseable timestamps
+        times = pd.to_datetime(work[group_col], errors="coerce")
+        valid = times.notna()
+        work = work[valid]
         
         # Apply time granularity
-        if intent.time_granularity == "day":
-            df["_time_group"] = df[group_col].dt.date
-        elif intent.time_granularity == "week":
-            df["_time_group"] = df[group_col].dt.to_period("W").astype(str)
-        elif intent.time_granularity == "month":
-            df["_time_group"] = df[group_col].dt.to_period("M").astype(str)
-        elif intent.time_granularity == "quarter":
-            df["_time_group"] = df[group_col].dt.to_period("Q").astype(str)
-        elif intent.time_granularity == "year":
-            df["_time_group"] = df[group_col].dt.year
-        else:
-            df["_time_group"] = df[group_col].dt.date
-        group_col = "_time_group"
+        group_key = _time_bucket(times[valid], intent.time_granularity)
+    else:
+        group_key = _dimension_group_key(work[group_col])
     
     # Group and aggregate
     if metric_col:
-        grouped = df.groupby(group_col)[metric_col]
+        grouped = work.groupby(group_key, observed=True)[metric_col]
         if intent.aggregation == "sum":
             aggregated = grouped.sum()
         elif intent.aggregation == "mean":
@@ -538,23 +636,28 @@ def execute_rank(
             raise ValueError(f"Unsupported aggregation: {intent.aggregation}")
     else:
         # For count without metric, count rows per group
-        aggregated = df.groupby(group_col).size()
+        aggregated = work.groupby(group_key, observed=True).size()
     
-    # Sort
-    ascending = intent.order == "asc"
-    sorted_data = aggregated.sort_values(ascending=ascending)
+    # Convert integer period codes back to labels (only the kept groups)
+    if intent.group_by_role == "timestamp":
+        aggregated = _label_time_buckets(aggregated, intent.time_granularity)
     
+    # Sort (partial sort when only the top/bottom N are kept)
+    ascending = intent.order == "asc"
     if intent.limit:
-        sorted_data = sorted_data.head(intent.limit)
+        sorted_data = aggregated.nsmallest(intent.limit) if ascending else aggregated.nlargest(intent.limit)
+    else:
+        sorted_data = aggregated.sort_values(ascending=ascending)
     
     # Build result data
+    keys, values = _series_columns(sorted_data)
     result_data = [
         {
-            "group": str(k),
-            "value": float(v),
+            "group": k,
+            "value": v,
             "rank": i + 1
         }
-        for i, (k, v) in enumerate(sorted_data.items())
+        for i, (k, v) in enumerate(zip(keys, values))
     ]
     
     return {
@@ -615,13 +718,8 @@ def execute_intent(
     column_profiles = profile_data.get("columns", [])
     dataset_name = profile_data.get("dataset", {}).get("name", "data.csv")
     
-    # Load dataset file (stored with original filename)
-    dataset_bytes = storage.get_file(dataset_id, dataset_name)
-    if not dataset_bytes:
-        raise ValueError(f"Dataset file {dataset_name} not found for dataset {dataset_id}")
-    
-    # Load DataFrame
-    df = get_dataframe_from_bytes(dataset_bytes, dataset_name)
+    # Load DataFrame (Parquet copy if available, else original file)
+    df = load_dataset_dataframe(dataset_id, dataset_name)
     
     # Execute based on intent type
     total_rows = len(df)
@@ -679,17 +777,18 @@ def _validate_result(result_data: Dict[str, Any], total_rows: int) -> None:
         if not isinstance(data, list):
             raise ValueError(f"Expected list data for {result_type}, got {type(data)}")
         
-        # Validate each item
-        for item in data:
-            if "value" in item:
-                value = item["value"]
-                if isinstance(value, (int, float)):
-                    if not np.isfinite(value):
-                        raise ValueError("Result contains invalid numeric value (NaN or infinite)")
-                # Count validation
-                if "count" in str(result_data.get("aggregation", "")).lower():
-                    if value > total_rows:
-                        raise ValueError(f"Count value ({value}) exceeds total rows ({total_rows})")
+        # Validate all values in a single vectorized sweep
+        is_count = "count" in str(result_data.get("aggregation", "")).lower()
+        values = np.fromiter(
+            (item["value"] for item in data if isinstance(item.get("value"), (int, float))),
+            dtype=np.float64,
+        )
+        if not np.isfinite(values).all():
+            raise ValueError("Result contains invalid numeric value (NaN or infinite)")
+        # Count validation
+        if is_count and (values > total_rows).any():
+            value = values[values > total_rows][0]
+            raise ValueError(f"Count value ({value}) exceeds total rows ({total_rows})")
         
         # Ranking limit validation
         if result_type == "ranking" and result_data.get("limit"):
@@ -14,12 +14,20 @@ This module is intentionally small and generic so it can be reused by:
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import heapq
 import logging
 import os
+import re
+import secrets
+import threading
 import time
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-from groq import Groq
+import httpx
+from groq import AsyncGroq, Groq
 
 logger = logging.getLogger(__name__)
 
@@ -27,34 +35,184 @@ logger = logging.getLogger(__name__)
 # === Model Priority Configuration ===
 
 PRIMARY_MODEL = "llama-3.3-70b-versatile"
+# Lowest-latency model; callers may prefer it for simple requests (preferred_model)
+FAST_MODEL = "llama-3.1-8b-instant"
 FALLBACK_MODELS: List[str] = [
     "llama-3.1-70b-versatile",
-    "llama-3.1-8b-instant",
+    FAST_MODEL,
 ]
 
 MODEL_PRIORITY: List[str] = [PRIMARY_MODEL] + FALLBACK_MODELS
+_PRIORITY_INDEX: Dict[str, int] = {name: i for i, name in enumerate(MODEL_PRIORITY)}
 
 # Cooldown state: model_name -> unix timestamp until which the model is considered unavailable
 _model_cooldowns: Dict[str, float] = {name: 0.0 for name in MODEL_PRIORITY}
 
+# Consecutive temporary failures per model (reset on a successful call)
+_model_failcount: Dict[str, int] = {name: 0 for name in MODEL_PRIORITY}
+
+# Guards cooldown / failure-count updates from concurrent requests
+_state_lock = threading.Lock()
+
+# Cooldown bounds (seconds). Without a retry hint from the server, the cooldown
+# backs off exponentially from DEFAULT_COOLDOWN_SECONDS with jitter.
+DEFAULT_COOLDOWN_SECONDS = 90.0
+MIN_COOLDOWN_SECONDS = 1.0
+MAX_COOLDOWN_SECONDS = 300.0
+
+# Headers that tell us when a rate-limited model can be retried
+_RETRY_HEADERS = ("retry-after", "x-ratelimit-reset-tokens")
+
+# Durations as sent by Groq: plain seconds ("2", "7.66") or composite ("1m30.5s", "250ms")
+_DURATION_RE = re.compile(
+    r"^(?:(?P<h>\d+(?:\.\d+)?)h)?(?:(?P<m>\d+(?:\.\d+)?)m(?!s))?"
+    r"(?:(?P<s>\d+(?:\.\d+)?)s)?(?:(?P<ms>\d+(?:\.\d+)?)ms)?$"
+)
+_TRY_AGAIN_RE = re.compile(r"try again in ([\dhms.]+)", re.IGNORECASE)
+
+# Common signals for rate limiting / temporary failure in error messages
+_RATE_LIMIT_RE = re.compile(
+    r"rate limit|quota|\b(?:429|503)\b|service unavailable", re.IGNORECASE
+)
+
+_jitter = secrets.SystemRandom()
+
+
+# === Client-side Token Budget ===
+# Per-model tokens-per-minute limits (0 disables throttling for that model).
+# Calls that would exceed a model's budget skip straight to the next model
+# instead of spending a round-trip on a guaranteed 429.
+
+GROQ_TPM_PRIMARY = int(os.getenv("GROQ_TPM_PRIMARY", "6000"))
+GROQ_TPM_FALLBACK = int(os.getenv("GROQ_TPM_FALLBACK", "6000"))
+
+_REMAINING_TOKENS_HEADER = "x-ratelimit-remaining-tokens"
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `tokens_per_minute`."""
+
+    def __init__(self, tokens_per_minute: float):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def can_consume(self, amount: float) -> bool:
+        """Whether `amount` tokens are available right now (nothing is consumed)."""
+        with self._lock:
+            self._refill()
+            return self.tokens >= amount
+
+    def consume(self, amount: float) -> None:
+        """Spend `amount` tokens (may leave the bucket temporarily in debt)."""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+    def reconcile(self, remaining: float) -> None:
+        """Align the bucket with the server-reported remaining budget."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, remaining)
+
+
+_buckets: Dict[str, TokenBucket] = {
+    name: TokenBucket(GROQ_TPM_PRIMARY if name == PRIMARY_MODEL else GROQ_TPM_FALLBACK)
+    for name in MODEL_PRIORITY
+    if (GROQ_TPM_PRIMARY if name == PRIMARY_MODEL else GROQ_TPM_FALLBACK) > 0
+}
+
+
+def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Rough request cost: completion budget plus ~4 characters per prompt token."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return max_tokens + prompt_chars // 4
+
+
+def _has_token_budget(model: str, estimated_tokens: int) -> bool:
+    bucket = _buckets.get(model)
+    return bucket is None or bucket.can_consume(estimated_tokens)
+
+
+def _spend_tokens(model: str, estimated_tokens: int) -> None:
+    bucket = _buckets.get(model)
+    if bucket is not None:
+        bucket.consume(estimated_tokens)
+
+
+def _reconcile_tokens(model: str, headers: Any) -> None:
+    """Reset a model's bucket from the x-ratelimit-remaining-tokens header, if sent."""
+    bucket = _buckets.get(model)
+    if bucket is None or not headers:
+        return
+    value = headers.get(_REMAINING_TOKENS_HEADER)
+    if value is None:
+        return
+    try:
+        bucket.reconcile(float(value))
+    except ValueError:
+        pass
+
 
 def _now() -> float:
     return time.time()
 
 
-def _is_in_cooldown(model: str, now: Optional[float] = None) -> bool:
-    if now is None:
-        now = _now()
-    return _model_cooldowns.get(model, 0.0) > now
-
+def _mark_unavailable(model: str, cooldown_seconds: Optional[float] = None) -> None:
+    """
+    Mark a model as temporarily unavailable (rate-limited / 503).
 
-def _mark_unavailable(model: str, cooldown_seconds: int = 90) -> None:
-    """Mark a model as temporarily unavailable (rate-limited / 503)."""
-    until = _now() + cooldown_seconds
-    _model_cooldowns[model] = until
+    If no explicit cooldown is given, back off exponentially with the number of
+    consecutive failures (base * 2**n, capped), scaled by a random jitter in
+    [0.5, 1.0] so repeated failures don't re-probe in lockstep.
+    """
+    with _state_lock:
+        failures = _model_failcount.get(model, 0)
+        if cooldown_seconds is None:
+            backoff = min(MAX_COOLDOWN_SECONDS, DEFAULT_COOLDOWN_SECONDS * (2 ** failures))
+            cooldown_seconds = backoff * _jitter.uniform(0.5, 1.0)
+        _model_failcount[model] = failures + 1
+
+        until = _now() + cooldown_seconds
+        _model_cooldowns[model] = until
     logger.warning("Model %s marked unavailable until %s", model, time.strftime("%H:%M:%S", time.localtime(until)))
 
 
+def _mark_available(model: str) -> None:
+    """Reset a model's failure count after a successful call."""
+    with _state_lock:
+        _model_failcount[model] = 0
+
+
+def _models_to_try(now: float) -> List[str]:
+    """
+    Order models for the next call.
+
+    Models out of cooldown come first, in priority order. If every model is
+    cooling down, all are returned ordered by cooldown expiry (earliest first,
+    ties broken by priority) so the likeliest-to-succeed model is tried first.
+    """
+    with _state_lock:
+        heap = [
+            (until if until > now else 0.0, _PRIORITY_INDEX[model], model)
+            for model, until in _model_cooldowns.items()
+        ]
+    heapq.heapify(heap)
+    ordered = [heapq.heappop(heap) for _ in range(len(heap))]
+
+    available = [model for until, _, model in ordered if until == 0.0]
+    if available:
+        return available
+    return [model for _, _, model in ordered]
+
+
 def _is_rate_limit_or_unavailable_error(exc: Exception) -> bool:
     """
     Heuristic to detect temporary availability issues (rate limits / 503).
@@ -62,16 +220,8 @@ def _is_rate_limit_or_unavailable_error(exc: Exception) -> bool:
     We intentionally avoid depending on specific Groq error types so this
     remains robust across library versions.
     """
-    text = str(exc).lower()
-
-    # Common signals for rate limiting / temporary failure
-    if "rate limit" in text or "quota" in text:
-        return True
-
-    # Look for HTTP status codes in the message
-    if "429" in text or "status 429" in text:
-        return True
-    if "503" in text or "status 503" in text or "service unavailable" in text:
+    # Rate-limit wording or HTTP status codes in the message
+    if _RATE_LIMIT_RE.search(str(exc)):
         return True
 
     # Some Groq errors expose status/status_code attributes
@@ -82,6 +232,102 @@ def _is_rate_limit_or_unavailable_error(exc: Exception) -> bool:
     return False
 
 
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a retry duration ("2", "7.66s", "1m30s", "250ms") into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    match = _DURATION_RE.match(value)
+    if not match or not any(match.groupdict().values()):
+        return None
+
+    parts = {k: float(v) for k, v in match.groupdict().items() if v}
+    return (
+        parts.get("h", 0.0) * 3600
+        + parts.get("m", 0.0) * 60
+        + parts.get("s", 0.0)
+        + parts.get("ms", 0.0) / 1000
+    )
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    """
+    Extract the server's retry hint from a rate-limit error, if any.
+
+    Checks response headers (Retry-After, x-ratelimit-reset-tokens) first,
+    then the "try again in Ns" text Groq includes in its error messages.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        for header in _RETRY_HEADERS:
+            value = headers.get(header)
+            if value:
+                seconds = _parse_duration(str(value))
+                if seconds is not None:
+                    return seconds
+
+    match = _TRY_AGAIN_RE.search(str(exc))
+    if match:
+        return _parse_duration(match.group(1).rstrip("."))
+
+    return None
+
+
+def _cooldown_for(exc: Exception) -> Optional[float]:
+    """Cooldown from the server's retry hint (clamped), or None to use backoff."""
+    retry_after = _retry_after_seconds(exc)
+    if retry_after is None:
+        return None
+    return min(max(retry_after, MIN_COOLDOWN_SECONDS), MAX_COOLDOWN_SECONDS)
+
+
+# Connection pool for the shared client (concurrent requests from FastAPI workers)
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONN", "50"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = 20
+GROQ_HTTP_TIMEOUT_SECONDS = 30.0
+
+
+@lru_cache(maxsize=1)
+def _client_for(api_key: str) -> Groq:
+    """Build (once per API key) the Groq client shared across callers and threads."""
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(GROQ_HTTP_TIMEOUT_SECONDS),
+    )
+    atexit.register(http_client.close)
+    return Groq(api_key=api_key, http_client=http_client)
+
+
+@lru_cache(maxsize=1)
+def _async_client_for(api_key: str) -> AsyncGroq:
+    """Build (once per API key) the shared AsyncGroq client."""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(GROQ_HTTP_TIMEOUT_SECONDS),
+    )
+    return AsyncGroq(api_key=api_key, http_client=http_client)
+
+
+def get_async_groq_client() -> Optional[AsyncGroq]:
+    """Return a shared AsyncGroq client instance, or None if no API key is configured."""
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.warning("GROQ_API_KEY not set - Groq client unavailable")
+        return None
+
+    return _async_client_for(api_key)
+
+
 def get_groq_client() -> Optional[Groq]:
     """
     Return a shared Groq client instance, or None if no API key is configured.
@@ -93,15 +339,32 @@ def get_groq_client() -> Optional[Groq]:
         logger.warning("GROQ_API_KEY not set - Groq client unavailable")
         return None
 
-    # Simple module-level singleton
-    global _shared_client  # type: ignore[assignment]
-    try:
-        client: Groq = _shared_client  # type: ignore[name-defined]
-    except NameError:
-        _shared_client = Groq(api_key=api_key)  # type: ignore[assignment]
-        client = _shared_client  # type: ignore[assignment]
+    return _client_for(api_key)
+
+
+def _plan_models(estimated_tokens: int, preferred_model: Optional[str] = None) -> List[str]:
+    """
+    Models to try for a request, in order.
 
-    return client
+    A preferred_model that is out of cooldown and within budget goes first;
+    the rest keep their usual order, so a failure there falls back as normal.
+
+    If everything is in cooldown, models are tried in order of cooldown expiry
+    and the existing error handling surfaces any failure. Models without enough
+    client-side token budget are deferred to the end (the estimate is
+    approximate; the server stays the final authority).
+    """
+    now = _now()
+    candidates = _models_to_try(now)
+
+    within_budget = [m for m in candidates if _has_token_budget(m, estimated_tokens)]
+    throttled = [m for m in candidates if m not in within_budget]
+    if throttled:
+        logger.info("Groq models over client-side token budget, deferred: %s", ", ".join(throttled))
+    if preferred_model in within_budget and _model_cooldowns.get(preferred_model, 0.0) <= now:
+        within_budget.remove(preferred_model)
+        within_budget.insert(0, preferred_model)
+    return within_budget + throttled
 
 
 def call_with_fallback(
@@ -111,30 +374,29 @@ def call_with_fallback(
     temperature: float,
     max_tokens: int,
     timeout_seconds: Optional[float] = None,
+    stream: bool = False,
+    preferred_model: Optional[str] = None,
+    response_format: Optional[Dict[str, Any]] = None,
 ) -> Any:
     """
     Call Groq chat.completions.create with automatic model fallback.
 
     BEHAVIOR:
-    - Try models in MODEL_PRIORITY order, skipping those in cooldown.
+    - Try models in MODEL_PRIORITY order, skipping those in cooldown
+      (or, if all are cooling down, in order of earliest cooldown expiry).
     - On rate limit / temporary errors (429/503), mark model in cooldown and try the next.
     - On non-temporary errors, re-raise immediately (preserves existing behavior).
     - If all models fail, re-raise the last error so callers can map it to their
       existing user-facing messages.
+    - With stream=True the returned object is a chunk stream; rate-limit and
+      availability errors still surface at request time, so fallback works the same.
+    - preferred_model (e.g. FAST_MODEL for simple requests) is tried first when
+      it is available; the other models remain as fallbacks.
+    - response_format (e.g. {"type": "json_object"}) is passed through to every
+      model tried.
     """
-    now = _now()
-    available_models = [m for m in MODEL_PRIORITY if not _is_in_cooldown(m, now)]
-
-    # If everything is in cooldown, allow trying the primary again after cooldown expiry.
-    if not available_models:
-        # Find earliest cooldown expiry and, if already passed, clear it for primary.
-        earliest = min(_model_cooldowns.values() or [0.0])
-        if earliest <= now:
-            available_models = MODEL_PRIORITY[:]
-        else:
-            # Still within global cooldown; we'll still try in priority order and let
-            # the existing error handling surface.
-            available_models = MODEL_PRIORITY[:]
+    estimated_tokens = _estimate_tokens(messages, max_tokens)
+    available_models = _plan_models(estimated_tokens, preferred_model)
 
     last_error: Optional[Exception] = None
 
@@ -147,17 +409,28 @@ def call_with_fallback(
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
+            if stream:
+                kwargs["stream"] = True
+            if response_format is not None:
+                kwargs["response_format"] = response_format
+            _spend_tokens(model, estimated_tokens)
             if timeout_seconds is not None:
                 # Use Groq client's with_options to set timeout if requested
-                response = client.with_options(timeout=timeout_seconds).chat.completions.create(**kwargs)
+                completions = client.with_options(timeout=timeout_seconds).chat.completions
             else:
-                response = client.chat.completions.create(**kwargs)
+                completions = client.chat.completions
+            # Raw response gives access to the rate-limit headers; parse() yields
+            # the usual completion object (or stream).
+            raw_response = completions.with_raw_response.create(**kwargs)
+            _reconcile_tokens(model, raw_response.headers)
+            response = raw_response.parse()
+            _mark_available(model)
             return response
 
         except Exception as exc:  # noqa: BLE001 - we intentionally handle all errors here
             last_error = exc
             if _is_rate_limit_or_unavailable_error(exc):
-                _mark_unavailable(model)
+                _mark_unavailable(model, _cooldown_for(exc))
                 # Try the next model in the list
                 continue
 
@@ -175,4 +448,114 @@ def call_with_fallback(
     raise RuntimeError("No Groq models available for request")
 
 
+# === Async Variant (hedged) ===
+
+# Delay before a hedged request is sent to the next model
+HEDGE_DELAY_SECONDS = 0.3
+
+
+async def _attempt_async(
+    client: AsyncGroq,
+    model: str,
+    kwargs: Dict[str, Any],
+    estimated_tokens: int,
+    timeout_seconds: Optional[float],
+) -> Any:
+    """Single AsyncGroq call for one model, updating cooldown and token state."""
+    logger.info("Calling Groq model: %s", model)
+    _spend_tokens(model, estimated_tokens)
+    if timeout_seconds is not None:
+        completions = client.with_options(timeout=timeout_seconds).chat.completions
+    else:
+        completions = client.chat.completions
+    try:
+        raw_response = await completions.with_raw_response.create(model=model, **kwargs)
+    except Exception as exc:  # noqa: BLE001 - classified below, then re-raised
+        if _is_rate_limit_or_unavailable_error(exc):
+            _mark_unavailable(model, _cooldown_for(exc))
+        raise
+    _reconcile_tokens(model, raw_response.headers)
+    response = await raw_response.parse()
+    _mark_available(model)
+    return response
+
+
+async def call_with_fallback_async(
+    client: AsyncGroq,
+    *,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    timeout_seconds: Optional[float] = None,
+    preferred_model: Optional[str] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    Async counterpart of call_with_fallback with a hedged first attempt.
+
+    BEHAVIOR:
+    - Same model ordering, cooldown and error semantics as call_with_fallback.
+    - If the first model was rate-limited recently (it has just left cooldown),
+      the next model is started HEDGE_DELAY_SECONDS later if the first hasn't
+      answered yet; the first success wins and the other request is cancelled.
+      Healthy primaries are never hedged, so quota isn't spent twice.
+    """
+    estimated_tokens = _estimate_tokens(messages, max_tokens)
+    available_models = _plan_models(estimated_tokens, preferred_model)
+    kwargs: Dict[str, Any] = dict(
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+
+    def attempt(model: str) -> "asyncio.Task[Any]":
+        return asyncio.ensure_future(
+            _attempt_async(client, model, kwargs, estimated_tokens, timeout_seconds)
+        )
+
+    last_error: Optional[Exception] = None
+    tried: List[str] = []
+
+    first_model = available_models[0]
+    if len(available_models) > 1 and _model_failcount.get(first_model, 0) > 0:
+        tasks = {attempt(first_model): first_model}
+        done, _ = await asyncio.wait(tasks, timeout=HEDGE_DELAY_SECONDS)
+        if not done:
+            tasks[attempt(available_models[1])] = available_models[1]
+        tried = list(tasks.values())
+
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        return task.result()
+                    if not _is_rate_limit_or_unavailable_error(exc):
+                        logger.error("Groq call failed for model %s: %s", tasks[task], exc)
+                        raise exc
+                    last_error = exc
+        finally:
+            for task in pending:
+                task.cancel()
+
+    for model in available_models:
+        if model in tried:
+            continue
+        try:
+            return await attempt(model)
+        except Exception as exc:  # noqa: BLE001 - we intentionally handle all errors here
+            last_error = exc
+            if _is_rate_limit_or_unavailable_error(exc):
+                continue
+            logger.error("Groq call failed for model %s: %s", model, exc)
+            raise
+
+    if last_error is not None:
+        logger.error("All Groq models failed due to temporary errors: %s", last_error)
+        raise last_error
 
+    raise RuntimeError("No Groq models available for request")
@@ -7,9 +7,12 @@ All decisions are based on DATA BEHAVIOR, not semantics or naming.
 Validation: If all column names are randomly renamed, behavior must be identical.
 """
 
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Literal, Optional, Dict, List
+from typing import Literal, Optional, Dict, List, Tuple
 from dataclasses import dataclass
 
 
@@ -72,6 +75,62 @@ def classify_column_role(
     return "dimension"
 
 
+# === Shared Coercion Cache ===
+# Coercing a column with pd.to_numeric / pd.to_datetime re-parses every value.
+# The health check and insights endpoints each parse their own DataFrame from
+# the same stored file, so results are keyed by (dataset_id, file version,
+# column, kind) rather than by DataFrame; a replaced file gets a new version.
+# Callers that pass no source (e.g. an ad-hoc DataFrame) coerce uncached.
+
+COERCE_CACHE_SIZE = 32
+
+CoercionKind = Literal["numeric", "datetime"]
+# (dataset_id, (mtime_ns, size) of the file the DataFrame was parsed from)
+CoercionSource = Tuple[str, Tuple[int, int]]
+
+_coerce_cache: "OrderedDict[Tuple[str, Tuple[int, int], str, CoercionKind], pd.Series]" = OrderedDict()
+_coerce_cache_lock = threading.Lock()
+
+
+def _coerce(series: pd.Series, kind: CoercionKind) -> pd.Series:
+    """Coerce a column, turning unparseable values into NaN/NaT."""
+    if kind == "numeric":
+        return pd.to_numeric(series, errors="coerce")
+    return pd.to_datetime(series, errors="coerce", utc=True)
+
+
+def _coerced(df: pd.DataFrame, col, kind: CoercionKind, source: Optional[CoercionSource]) -> pd.Series:
+    """Return the cached coercion of df[col], computing it on first use."""
+    if source is None:
+        return _coerce(df[col], kind)
+    
+    dataset_id, version = source
+    cache_key = (dataset_id, version, str(col), kind)
+    with _coerce_cache_lock:
+        series = _coerce_cache.get(cache_key)
+        if series is not None:
+            _coerce_cache.move_to_end(cache_key)
+            return series
+    
+    series = _coerce(df[col], kind)
+    with _coerce_cache_lock:
+        _coerce_cache[cache_key] = series
+        _coerce_cache.move_to_end(cache_key)
+        if len(_coerce_cache) > COERCE_CACHE_SIZE:
+            _coerce_cache.popitem(last=False)
+    return series
+
+
+def get_numeric(df: pd.DataFrame, col, source: Optional[CoercionSource] = None) -> pd.Series:
+    """df[col] coerced to numbers (failures → NaN). Shared; do not mutate."""
+    return _coerced(df, col, "numeric", source)
+
+
+def get_datetime(df: pd.DataFrame, col, source: Optional[CoercionSource] = None) -> pd.Series:
+    """df[col] coerced to tz-aware UTC datetimes (failures → NaT). Shared; do not mutate."""
+    return _coerced(df, col, "datetime", source)
+
+
 # === Severity Thresholds ===
 
 @dataclass
@@ -130,6 +189,31 @@ def calculate_missing_severity(role: ColumnRole, missing_percentage: float) -> S
     return calculate_severity(MISSING_THRESHOLDS[role], missing_percentage)
 
 
+# Vectorized form of calculate_missing_severity for all columns at once.
+# Each column gets its role's (low_max, medium_max) pair; the severity index
+# is the number of thresholds its percentage exceeds (0 → low, 2 → high).
+# A 0% threshold (identifiers) makes any missing value exceed it.
+
+SEVERITY_LEVELS = np.array(["low", "medium", "high"])
+
+
+def calculate_missing_severities(
+    roles: List[ColumnRole],
+    missing_percentages: np.ndarray
+) -> List[Severity]:
+    """Missing-value severity per column (same rules as calculate_missing_severity)."""
+    roles_arr = np.asarray(roles, dtype=object)
+    low_max = np.zeros(len(roles_arr))
+    medium_max = np.zeros(len(roles_arr))
+    for role, thresholds in MISSING_THRESHOLDS.items():
+        is_role = roles_arr == role
+        low_max[is_role] = thresholds.low_max
+        medium_max[is_role] = thresholds.medium_max
+    
+    levels = (missing_percentages > low_max).astype(np.intp) + (missing_percentages > medium_max)
+    return SEVERITY_LEVELS[levels].tolist()
+
+
 # === Impact Explanations (Generic, Deterministic - No Column Names) ===
 
 MISSING_EXPLANATIONS: dict[ColumnRole, str] = {
@@ -183,7 +267,8 @@ class HealthCheckResult:
 def run_health_check(
     df: pd.DataFrame,
     dataset_id: str,
-    column_profiles: List[Dict]
+    column_profiles: List[Dict],
+    data_version: Optional[Tuple[int, int]] = None
 ) -> HealthCheckResult:
     """
     Run comprehensive health check on a DataFrame.
@@ -200,6 +285,8 @@ def run_health_check(
         df: The DataFrame to check
         dataset_id: ID of the dataset
         column_profiles: List of column profiles with dtype info
+        data_version: Version of the file df was parsed from (storage.get_file_version);
+            enables the shared coercion cache
     
     Returns:
         HealthCheckResult with all issues found
@@ -209,24 +296,59 @@ def run_health_check(
     total_columns = len(df.columns)
     
     # Build column info map
-    column_info = {p["name"]: p for p in column_profiles}
+    column_info = {str(p["name"]): p for p in column_profiles}
+    
+    # Column labels as strings, resolved once for all checks
+    col_labels = df.columns.astype(str).tolist()
+    
+    # Per-column counts in one vectorized pass each (shared by all checks)
+    missing_counts = df.isna().sum().astype("int64")
+    unique_counts = df.nunique(dropna=True).astype("int64")
+    
+    # Columns whose storage dtype is already numeric / datetime cannot fail
+    # coercion, so their format checks skip the to_numeric / to_datetime pass
+    numeric_dtype_cols = set(df.select_dtypes(include="number").columns)
+    datetime_dtype_cols = set(df.select_dtypes(include=["datetime64", "datetimetz"]).columns)
+    
+    # Format issues are collected during the column pass but reported after
+    # the duplicate check, keeping the issue order stable.
+    format_issues: List[HealthIssue] = []
     
-    # === Check 1: Missing Values ===
-    for col in df.columns:
-        col_str = str(col)
+    # Coercions are shared with the insights endpoint when the file version is known
+    source: Optional[CoercionSource] = (dataset_id, data_version) if data_version is not None else None
+    
+    # Loop invariants
+    pct_scale = 100.0 / total_rows if total_rows else 0.0
+    invalid_numeric_explanation = FORMAT_EXPLANATIONS["invalid_numeric"]
+    negative_metric_explanation = FORMAT_EXPLANATIONS["negative_metric"]
+    invalid_date_explanation = FORMAT_EXPLANATIONS["invalid_date"]
+    future_date_explanation = FORMAT_EXPLANATIONS["future_date"]
+    
+    # Future dates: more than 1 year from now (tz-aware, like the coerced dates)
+    future_threshold = pd.Timestamp.now(tz="UTC") + pd.Timedelta(days=365)
+    
+    # Classify column roles (STRUCTURAL - no names used)
+    roles: List[ColumnRole] = []
+    for col, col_str in zip(df.columns, col_labels):
         profile = column_info.get(col_str, {})
         dtype = profile.get("dtype", "text")
-        unique_count = profile.get("unique_count", df[col].nunique())
-        
-        # Classify column role (STRUCTURAL - no names used)
-        role = classify_column_role(dtype, unique_count, total_rows)
+        unique_count = profile.get("unique_count", unique_counts[col])
+        roles.append(classify_column_role(dtype, unique_count, total_rows))
+    
+    # Missing-value severities for all columns in one vectorized pass
+    missing_pcts = missing_counts.to_numpy() * pct_scale
+    missing_severities = calculate_missing_severities(roles, missing_pcts)
+    
+    # === Checks 1 & 3: Missing Values and Format Validation (one pass over columns) ===
+    for i, (col, col_str) in enumerate(zip(df.columns, col_labels)):
+        role = roles[i]
         
-        # Count missing values
-        missing_count = int(df[col].isna().sum())
+        # === Check 1: Missing Values ===
+        missing_count = int(missing_counts.iat[i])
         
         if missing_count > 0:
-            missing_pct = (missing_count / total_rows) * 100
-            severity = calculate_missing_severity(role, missing_pct)
+            missing_pct = float(missing_pcts[i])
+            severity = missing_severities[i]
             
             issues.append(HealthIssue(
                 column=col_str,
@@ -238,130 +360,135 @@ def run_health_check(
                 explanation=MISSING_EXPLANATIONS[role],
                 role=role,
             ))
-    
-    # === Check 2: Duplicate Rows (Exact matches only) ===
-    # Uses full-row equality via DataFrame.duplicated()
-    # Severity: 0% → No issue, <1% → Low, 1-5% → Medium, >5% → High
-    duplicate_mask = df.duplicated(keep="first")
-    duplicate_count = int(duplicate_mask.sum())
-    
-    if duplicate_count > 0:
-        dup_pct = (duplicate_count / total_rows) * 100
-        severity = calculate_severity(DUPLICATE_THRESHOLDS, dup_pct)
-        
-        issues.append(HealthIssue(
-            column="(all columns)",
-            issue_type="duplicate",
-            severity=severity,
-            count=duplicate_count,
-            percentage=round(dup_pct, 2),
-            description=f"{duplicate_count:,} exact duplicate rows ({dup_pct:.1f}%)",
-            explanation=DUPLICATE_EXPLANATION,
-            role=None,
-        ))
-    
-    # === Check 3: Format Validation (Structural Only) ===
-    for col in df.columns:
-        col_str = str(col)
-        profile = column_info.get(col_str, {})
-        dtype = profile.get("dtype", "text")
-        unique_count = profile.get("unique_count", df[col].nunique())
-        
-        # Classify role (STRUCTURAL)
-        role = classify_column_role(dtype, unique_count, total_rows)
         
         # === Check 3a: METRIC columns - numeric validation ===
         if role == "metric":
-            # Convert to numeric, tracking coercion failures
-            original_series = df[col]
-            numeric_col = pd.to_numeric(original_series, errors="coerce")
-            
-            # Count non-null values that became NaN after coercion (coercion failures)
-            # These are values that CANNOT be converted to numbers
-            original_non_null = original_series.notna()
-            coerced_null = numeric_col.isna()
-            coercion_failures = int((original_non_null & coerced_null).sum())
+            if col in numeric_dtype_cols:
+                numeric_col = df[col]
+                coercion_failures = 0
+            else:
+                # Convert to numeric, tracking coercion failures
+                original_series = df[col]
+                numeric_col = get_numeric(df, col, source)
+                
+                # Count non-null values that became NaN after coercion (coercion failures)
+                # These are values that CANNOT be converted to numbers
+                # (plain bool arrays: no index alignment; the AND reuses the first buffer)
+                original_non_null = original_series.notna().to_numpy(copy=False)
+                coerced_null = numeric_col.isna().to_numpy(copy=False)
+                coercion_failures = int(np.logical_and(original_non_null, coerced_null, out=original_non_null).sum())
             
             if coercion_failures > 0:
-                coercion_pct = (coercion_failures / total_rows) * 100
+                coercion_pct = coercion_failures * pct_scale
                 severity = calculate_severity(FORMAT_THRESHOLDS, coercion_pct)
                 
-                issues.append(HealthIssue(
+                format_issues.append(HealthIssue(
                     column=col_str,
                     issue_type="format",
                     severity=severity,
                     count=coercion_failures,
                     percentage=round(coercion_pct, 2),
                     description=f"{coercion_failures:,} rows have non-numeric values",
-                    explanation=FORMAT_EXPLANATIONS["invalid_numeric"],
+                    explanation=invalid_numeric_explanation,
                     role=role,
                 ))
             
             # Check for negative values (only in successfully coerced values)
-            negative_count = int((numeric_col < 0).sum())
+            numeric_values = numeric_col.to_numpy(dtype="float64", na_value=np.nan)
+            negative_count = int(np.count_nonzero(numeric_values < 0))
             
             if negative_count > 0:
-                neg_pct = (negative_count / total_rows) * 100
+                neg_pct = negative_count * pct_scale
                 severity = calculate_severity(FORMAT_THRESHOLDS, neg_pct)
                 
-                issues.append(HealthIssue(
+                format_issues.append(HealthIssue(
                     column=col_str,
                     issue_type="format",
                     severity=severity,
                     count=negative_count,
                     percentage=round(neg_pct, 2),
                     description=f"{negative_count:,} rows have negative values",
-                    explanation=FORMAT_EXPLANATIONS["negative_metric"],
+                    explanation=negative_metric_explanation,
                     role=role,
                 ))
         
         # === Check 3b: TIMESTAMP columns - datetime validation ===
-        if role == "timestamp":
+        elif role == "timestamp":
             try:
-                original_series = df[col]
-                date_col = pd.to_datetime(original_series, errors="coerce")
-                
-                # Count unparseable datetime values (coercion failures)
-                original_non_null = original_series.notna()
-                coerced_null = date_col.isna()
-                unparseable_count = int((original_non_null & coerced_null).sum())
+                if col in datetime_dtype_cols:
+                    # Already datetimes: only normalized to UTC, nothing to parse
+                    date_col = get_datetime(df, col, source)
+                    unparseable_count = 0
+                else:
+                    original_series = df[col]
+                    date_col = get_datetime(df, col, source)
+                    
+                    # Count unparseable datetime values (coercion failures)
+                    original_non_null = original_series.notna().to_numpy(copy=False)
+                    coerced_null = date_col.isna().to_numpy(copy=False)
+                    unparseable_count = int(np.logical_and(original_non_null, coerced_null, out=original_non_null).sum())
                 
                 if unparseable_count > 0:
-                    unparseable_pct = (unparseable_count / total_rows) * 100
+                    unparseable_pct = unparseable_count * pct_scale
                     severity = calculate_severity(FORMAT_THRESHOLDS, unparseable_pct)
                     
-                    issues.append(HealthIssue(
+                    format_issues.append(HealthIssue(
                         column=col_str,
                         issue_type="format",
                         severity=severity,
                         count=unparseable_count,
                         percentage=round(unparseable_pct, 2),
                         description=f"{unparseable_count:,} rows have unparseable date values",
-                        explanation=FORMAT_EXPLANATIONS["invalid_date"],
+                        explanation=invalid_date_explanation,
                         role=role,
                     ))
                 
-                # Check for future dates (more than 1 year from now)
-                future_threshold = datetime.now() + timedelta(days=365)
-                future_count = int((date_col > future_threshold).sum())
+                future_count = int(np.count_nonzero((date_col > future_threshold).to_numpy(copy=False)))
                 
                 if future_count > 0:
-                    future_pct = (future_count / total_rows) * 100
+                    future_pct = future_count * pct_scale
                     severity = calculate_severity(FORMAT_THRESHOLDS, future_pct)
                     
-                    issues.append(HealthIssue(
+                    format_issues.append(HealthIssue(
                         column=col_str,
                         issue_type="format",
                         severity=severity,
                         count=future_count,
                         percentage=round(future_pct, 2),
                         description=f"{future_count:,} rows have dates more than 1 year in the future",
-                        explanation=FORMAT_EXPLANATIONS["future_date"],
+                        explanation=future_date_explanation,
                         role=role,
                     ))
             except Exception:
                 pass  # Skip if date parsing fails entirely
     
+    # === Check 2: Duplicate Rows (Exact matches only) ===
+    # Rows are first compared by a 64-bit hash (one int64 per row instead of
+    # hashing every column into a mask); exact full-row equality via
+    # DataFrame.duplicated() only runs when the hash pass finds candidates.
+    # Severity: 0% → No issue, <1% → Low, 1-5% → Medium, >5% → High
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    duplicate_count = int(pd.Index(row_hashes).duplicated(keep="first").sum())
+    if duplicate_count > 0:
+        duplicate_count = int(df.duplicated(keep="first").sum())
+    
+    if duplicate_count > 0:
+        dup_pct = duplicate_count * pct_scale
+        severity = calculate_severity(DUPLICATE_THRESHOLDS, dup_pct)
+        
+        issues.append(HealthIssue(
+            column="(all columns)",
+            issue_type="duplicate",
+            severity=severity,
+            count=duplicate_count,
+            percentage=round(dup_pct, 2),
+            description=f"{duplicate_count:,} exact duplicate rows ({dup_pct:.1f}%)",
+            explanation=DUPLICATE_EXPLANATION,
+            role=None,
+        ))
+    
+    issues.extend(format_issues)
+    
     # === Determine Overall Health ===
     high_count = sum(1 for i in issues if i.severity == "high")
     medium_count = sum(1 for i in issues if i.severity == "medium")
@@ -395,25 +522,13 @@ def run_health_check(
 
 
 def health_check_to_dict(result: HealthCheckResult) -> dict:
-    """Convert HealthCheckResult to JSON-serializable dict."""
-    return {
-        "dataset_id": result.dataset_id,
-        "total_rows": result.total_rows,
-        "total_columns": result.total_columns,
-        "issues": [
-            {
-                "column": i.column,
-                "issue_type": i.issue_type,
-                "severity": i.severity,
-                "count": i.count,
-                "percentage": i.percentage,
-                "description": i.description,
-                "explanation": i.explanation,
-                "role": i.role,
-            }
-            for i in result.issues
-        ],
-        "overall_health": result.overall_health,
-        "summary": result.summary,
-        "checks_performed": result.checks_performed,
-    }
+    """
+    Convert HealthCheckResult to JSON-serializable dict.
+    
+    Dataclass fields are declared in response order, so each instance's
+    __dict__ already is the response shape; the issue dicts are reused
+    rather than rebuilt key by key.
+    """
+    result_dict = dict(vars(result))
+    result_dict["issues"] = [vars(issue) for issue in result.issues]
+    return result_dict
@@ -18,11 +18,12 @@ CRITICAL CONSTRAINTS:
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 from models.schemas import Insight, InsightResult
-from services.health_check import classify_column_role
+from services.health_check import classify_column_role, get_datetime, get_numeric
 
 
 def _create_insight(insight_id: str, title: str, description: str) -> Insight:
@@ -41,11 +42,29 @@ def _create_insight(insight_id: str, title: str, description: str) -> Insight:
     )
 
 
+def _top_value_count(series: pd.Series) -> int:
+    """Occurrences of the most frequent non-null value (0 if all null).
+
+    Object columns are factorized to categorical codes once and counted with
+    np.bincount over the small integer codes instead of hashing strings.
+    """
+    if series.dtype == object:
+        series = series.astype("category")
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        codes = codes[codes >= 0]  # -1 marks missing values
+        return int(np.bincount(codes).max()) if codes.size else 0
+
+    counts = series.value_counts(sort=False, dropna=True)
+    return int(counts.max()) if not counts.empty else 0
+
+
 def generate_insights(
     dataset_id: str,
     df: pd.DataFrame,
     profile: Dict,
     health: Optional[Dict],
+    data_version: Optional[Tuple[int, int]] = None,
 ) -> InsightResult:
     """Generate structural key insights for a dataset.
 
@@ -53,8 +72,13 @@ def generate_insights(
     - It never uses column names or category labels in texts.
     - It only uses structural properties: row counts, column counts,
       data types, uniqueness, value distributions.
+
+    data_version is the version of the file df was parsed from
+    (storage.get_file_version). When given, numeric and datetime coercions
+    are shared with the health check run on the same file.
     """
     insights: List[Insight] = []
+    coercion_source = (dataset_id, data_version) if data_version is not None else None
 
     dataset_info = profile.get("dataset", {})
     columns = profile.get("columns", [])
@@ -87,8 +111,7 @@ def generate_insights(
         all_dates: List[datetime] = []
         for col_name in timestamp_cols:
             # Use structural behavior only; renaming columns doesn't change types.
-            series = df[col_name]
-            parsed = pd.to_datetime(series, errors="coerce")
+            parsed = get_datetime(df, col_name, coercion_source)
             non_null = parsed.dropna()
             if not non_null.empty:
                 all_dates.append(non_null.min())
@@ -126,12 +149,10 @@ def generate_insights(
             if role != "dimension":
                 continue
 
-            series = df[col_name]
-            counts = series.value_counts(dropna=True)
-            if counts.empty:
+            top_count = _top_value_count(df[col_name])
+            if top_count == 0:
                 continue
 
-            top_count = int(counts.iloc[0])
             share = top_count / total_rows
             if share > 0.40:
                 dominant_found = True
@@ -167,22 +188,15 @@ def generate_insights(
         if role != "metric":
             continue
 
-        # Convert to numeric; ignore coercion failures (NaN)
-        numeric = pd.to_numeric(df[col_name], errors="coerce").dropna()
-        if numeric.empty:
-            continue
-
-        abs_vals = numeric.abs()
-        non_zero = abs_vals[abs_vals > 0]
-        if non_zero.empty:
-            continue
-
-        max_val = float(non_zero.max())
-        min_val = float(non_zero.min())
-        if min_val <= 0:
+        # Convert to numeric (shared with the health check's coercion);
+        # coercion failures become NaN and are dropped with zeros below
+        values = get_numeric(df, col_name, coercion_source).to_numpy(dtype="float64", na_value=np.nan)
+        abs_vals = np.abs(values)
+        non_zero = abs_vals[np.isfinite(abs_vals) & (abs_vals > 0)]
+        if non_zero.size == 0:
             continue
 
-        ratio = max_val / min_val
+        ratio = float(non_zero.max()) / float(non_zero.min())
         if ratio >= 1000.0:
             wide_metric_found = True
             break
@@ -223,7 +237,7 @@ def generate_insights(
     result = InsightResult(
         dataset_id=dataset_id,
         insights=insights,
-        generated_at=datetime.utcnow(),
+        generated_at=pd.Timestamp.now(tz="UTC").to_pydatetime(),
     )
     return result
 
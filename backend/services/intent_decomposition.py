@@ -6,6 +6,7 @@ CORE PRINCIPLE: Understand intent structure, not semantics.
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List, Set, Optional, Literal, Tuple, Any
 from dataclasses import dataclass
 import logging
@@ -34,6 +35,64 @@ ORDERING_TERMS = {
 }
 
 
+# === Precompiled Patterns ===
+# Compiled once at import; decompose_intent runs on every question.
+
+_ORDERING_KEYWORDS: List[str] = list(dict.fromkeys(
+    kw for keywords in ORDERING_TERMS.values() for kw in keywords
+))
+
+# All ordering keywords in one alternation (longest first), so the question
+# is scanned once instead of once per keyword. The lookahead also captures the
+# word after the keyword ("lowest [target]") without consuming it.
+_ORDERING_KEYWORD_RE = re.compile(
+    r"\b(" + "|".join(re.escape(kw) for kw in sorted(_ORDERING_KEYWORDS, key=len, reverse=True)) + r")\b"
+    r"(?=(?:\s+(\w+))?)"
+)
+
+# Aggregation keywords in one pass; one named group per aggregation type
+_AGG_RE = re.compile(
+    r"\b(?:(?P<count>count|how many|number of)"
+    r"|(?P<sum>sum|total)"
+    r"|(?P<avg>avg|average|mean)"
+    r"|(?P<min>min|minimum|lowest)"
+    r"|(?P<max>max|maximum|highest))\b"
+)
+
+# When several aggregation types are mentioned, the first one listed wins
+_AGG_PRECEDENCE = ("count", "sum", "avg", "min", "max")
+
+# Grouping dimensions (concepts after "by", "grouped by", "per")
+_GROUPING_RES: List[re.Pattern] = [
+    re.compile(r"\bby\s+(\w+)"),
+    re.compile(r"\bgrouped\s+by\s+(\w+)"),
+    re.compile(r"\bper\s+(\w+)"),
+    re.compile(r"\bfor\s+each\s+(\w+)"),
+]
+
+# Filters (concepts after "where", "with", "having")
+_FILTER_RES: List[re.Pattern] = [
+    re.compile(r"\bwhere\s+(\w+)"),
+    re.compile(r"\bwith\s+(\w+)"),
+    re.compile(r"\bhaving\s+(\w+)"),
+]
+
+# Target metrics, e.g. "what is the [aggregation] of [concept]"
+_METRIC_RES: List[re.Pattern] = [
+    re.compile(r"\b(avg|average|sum|total|mean|min|max)\s+(of\s+)?(\w+)"),
+    re.compile(r"\bwhat\s+is\s+the\s+(\w+)"),
+    re.compile(r"\bthe\s+(\w+)\s+(is|has|equals)"),
+]
+
+
+# (target_metrics, filters, groupings, ordering_terms, ordering_target,
+#  aggregation_type, requires_ordering) - immutable so it can be cached
+_DecomposedFields = Tuple[
+    Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], Tuple[str, ...],
+    Optional[str], Optional[str], bool,
+]
+
+
 def decompose_intent(question: str) -> IntentComponents:
     """
     Decompose a question into structured components.
@@ -41,94 +100,90 @@ def decompose_intent(question: str) -> IntentComponents:
     Returns:
         IntentComponents with target metrics, filters, groupings, ordering terms
     """
-    question_lower = question.lower()
+    (
+        target_metrics, filters, groupings, ordering_terms,
+        ordering_target, aggregation_type, requires_ordering,
+    ) = _decompose_cached(question.lower())
     
+    # Fresh lists per call: the cached tuples are shared
+    return IntentComponents(
+        target_metrics=list(target_metrics),
+        filters=list(filters),
+        groupings=list(groupings),
+        ordering_terms=list(ordering_terms),
+        ordering_target=ordering_target,
+        aggregation_type=aggregation_type,
+        requires_ordering=requires_ordering,
+    )
+
+
+@lru_cache(maxsize=1024)
+def _decompose_cached(question_lower: str) -> _DecomposedFields:
+    """Extract intent components from a lowercased question (memoized)."""
     # Extract ordering terms
     ordering_terms = []
     ordering_target = None
     requires_ordering = False
     
-    for order_type, keywords in ORDERING_TERMS.items():
-        for keyword in keywords:
-            pattern = r"\b" + re.escape(keyword) + r"\b"
-            if re.search(pattern, question_lower):
-                ordering_terms.append(order_type)
-                requires_ordering = True
-                
-                # Try to extract what is being ordered
-                # Pattern: "lowest [concept]", "highest [concept]"
-                match = re.search(rf"\b{re.escape(keyword)}\s+(\w+)", question_lower)
-                if match:
-                    ordering_target = match.group(1)
-                break
+    # keyword -> word after its first occurrence that has one (None if never)
+    found_keywords: Dict[str, Optional[str]] = {}
+    for keyword, target in _ORDERING_KEYWORD_RE.findall(question_lower):
+        if not found_keywords.get(keyword):
+            found_keywords[keyword] = target or None
+    
+    if found_keywords:
+        for order_type, keywords in ORDERING_TERMS.items():
+            keyword = next((kw for kw in keywords if kw in found_keywords), None)
+            if keyword is None:
+                continue
+            
+            ordering_terms.append(order_type)
+            requires_ordering = True
+            
+            # What is being ordered
+            # Pattern: "lowest [concept]", "highest [concept]"
+            if found_keywords[keyword]:
+                ordering_target = found_keywords[keyword]
     
     # Extract aggregation type
     aggregation_type = None
-    if re.search(r"\b(count|how many|number of)\b", question_lower):
-        aggregation_type = "count"
-    elif re.search(r"\b(sum|total)\b", question_lower):
-        aggregation_type = "sum"
-    elif re.search(r"\b(avg|average|mean)\b", question_lower):
-        aggregation_type = "avg"
-    elif re.search(r"\b(min|minimum|lowest)\b", question_lower):
-        aggregation_type = "min"
-    elif re.search(r"\b(max|maximum|highest)\b", question_lower):
-        aggregation_type = "max"
-    
-    # Extract grouping dimensions (concepts after "by", "grouped by", "per")
-    groupings = []
-    grouping_patterns = [
-        r"\bby\s+(\w+)",
-        r"\bgrouped\s+by\s+(\w+)",
-        r"\bper\s+(\w+)",
-        r"\bfor\s+each\s+(\w+)",
-    ]
-    for pattern in grouping_patterns:
-        matches = re.findall(pattern, question_lower)
-        groupings.extend(matches)
-    
-    # Extract filters (concepts after "where", "with", "having")
-    filters = []
-    filter_patterns = [
-        r"\bwhere\s+(\w+)",
-        r"\bwith\s+(\w+)",
-        r"\bhaving\s+(\w+)",
-    ]
-    for pattern in filter_patterns:
-        matches = re.findall(pattern, question_lower)
-        filters.extend(matches)
+    found_aggregations = {m.lastgroup for m in _AGG_RE.finditer(question_lower)}
+    if found_aggregations:
+        aggregation_type = next(agg for agg in _AGG_PRECEDENCE if agg in found_aggregations)
+    
+    # Dicts used as ordered sets: duplicates are dropped as they are found and
+    # first-seen order is kept, so the output is deterministic
+    
+    # Extract grouping dimensions
+    groupings: Dict[str, None] = {}
+    for pattern in _GROUPING_RES:
+        groupings.update(dict.fromkeys(pattern.findall(question_lower)))
+    
+    # Extract filters
+    filters: Dict[str, None] = {}
+    for pattern in _FILTER_RES:
+        filters.update(dict.fromkeys(pattern.findall(question_lower)))
     
     # Extract target metrics (concepts being measured)
-    target_metrics = []
-    # Pattern: "what is the [aggregation] of [concept]"
-    metric_patterns = [
-        r"\b(avg|average|sum|total|mean|min|max)\s+(of\s+)?(\w+)",
-        r"\bwhat\s+is\s+the\s+(\w+)",
-        r"\bthe\s+(\w+)\s+(is|has|equals)",
-    ]
-    for pattern in metric_patterns:
-        matches = re.findall(pattern, question_lower)
+    target_metrics: Dict[str, None] = {}
+    for pattern in _METRIC_RES:
+        matches = pattern.findall(question_lower)
         for match in matches:
             if isinstance(match, tuple):
-                target_metrics.extend([m for m in match if m and m not in ["of", "is", "has", "equals"]])
+                target_metrics.update(dict.fromkeys(m for m in match if m and m not in ["of", "is", "has", "equals"]))
             else:
-                target_metrics.append(match)
-    
-    # Remove duplicates
-    target_metrics = list(set(target_metrics))
-    groupings = list(set(groupings))
-    filters = list(set(filters))
-    
-    logger.info(f"Decomposed intent: metrics={target_metrics}, groupings={groupings}, filters={filters}, ordering={ordering_terms}")
-    
-    return IntentComponents(
-        target_metrics=target_metrics,
-        filters=filters,
-        groupings=groupings,
-        ordering_terms=ordering_terms,
-        ordering_target=ordering_target,
-        aggregation_type=aggregation_type,
-        requires_ordering=requires_ordering,
+                target_metrics[match] = None
+    
+    logger.info(f"Decomposed intent: metrics={list(target_metrics)}, groupings={list(groupings)}, filters={list(filters)}, ordering={ordering_terms}")
+    
+    return (
+        tuple(target_metrics),
+        tuple(filters),
+        tuple(groupings),
+        tuple(ordering_terms),
+        ordering_target,
+        aggregation_type,
+        requires_ordering,
     )
 
 
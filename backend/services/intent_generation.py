@@ -9,12 +9,13 @@ Output: Validated intent JSON
 """
 
 import json
+import logging
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
-from groq import Groq
-from services.groq_client import call_with_fallback
 
 # Load environment variables from .env file
 # Look for .env in backend directory (parent of services) or project root
@@ -35,19 +36,78 @@ from models.intent import (
 )
 
 
-# Initialize Groq client
+# Groq client, created on first use
 # API key MUST be loaded from environment variable GROQ_API_KEY
-_groq_api_key = os.getenv("GROQ_API_KEY")
-if _groq_api_key:
+# (groq is imported here rather than at module level so importing this module stays cheap)
+@lru_cache(maxsize=1)
+def _get_client() -> Optional[Any]:
+    """Return the Groq client, or None if GROQ_API_KEY is unset or init fails."""
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        return None
     try:
-        client: Optional[Groq] = Groq(api_key=_groq_api_key)
+        from groq import Groq
+        return Groq(api_key=groq_api_key)
     except Exception as e:
-        # Log error for debugging but don't fail module import
-        import logging
+        # Log error for debugging but don't fail the caller
         logging.warning(f"Failed to initialize Groq client: {e}")
-        client = None
-else:
-    client = None
+        return None
+
+
+# Markdown code fence around the JSON (```json ... ``` or ``` ... ```)
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+# Last-resort JSON object finder (one level of nesting)
+_JSON_BLOCK_RE = re.compile(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}")
+
+# Cap on how much text the last-resort finder scans
+_MAX_JSON_SCAN_CHARS = 10_000
+
+
+def _read_json_object(stream: Any) -> str:
+    """
+    Accumulate streamed completion text until the first JSON object closes.
+    
+    Braces are counted outside of JSON strings; once the outermost object is
+    balanced the stream is closed, so trailing prose is never generated or
+    downloaded. Returns everything received if no object completes.
+    """
+    parts: List[str] = []
+    depth = 0
+    started = in_string = escaped = False
+    
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            parts.append(text)
+            
+            for char in text:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"' and started:
+                    in_string = True
+                elif char == "{":
+                    depth += 1
+                    started = True
+                elif char == "}" and started:
+                    depth -= 1
+                    if depth == 0:
+                        return "".join(parts)
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    
+    return "".join(parts)
 
 
 def generate_intent(request: IntentRequest) -> IntentResponse:
@@ -65,6 +125,7 @@ def generate_intent(request: IntentRequest) -> IntentResponse:
     - Sample values
     - Row data
     """
+    client = _get_client()
     if client is None:
         raise ValueError(
             "Groq client not initialized. "
@@ -165,6 +226,8 @@ Dataset metadata:
 
 Generate the intent JSON (ONLY JSON, no other text):"""
 
+    from services.groq_client import call_with_fallback
+    
     try:
         response = call_with_fallback(
             client,
@@ -174,24 +237,17 @@ Generate the intent JSON (ONLY JSON, no other text):"""
             ],
             temperature=0.1,  # Low temperature for deterministic output
             max_tokens=500,
+            stream=True,  # Stop reading as soon as the intent object is complete
         )
+        raw_content = _read_json_object(response)
         
         # Parse JSON response - handle cases where LLM wraps JSON in markdown or adds text
-        content = response.choices[0].message.content.strip()
+        content = raw_content.strip()
         
-        # Try to extract JSON if wrapped in code blocks
-        if "```json" in content:
-            # Extract JSON from markdown code block
-            start = content.find("```json") + 7
-            end = content.find("```", start)
-            if end != -1:
-                content = content[start:end].strip()
-        elif "```" in content:
-            # Extract from generic code block
-            start = content.find("```") + 3
-            end = content.find("```", start)
-            if end != -1:
-                content = content[start:end].strip()
+        # Try to extract JSON if wrapped in a markdown code block
+        fence_match = _FENCE_RE.search(content)
+        if fence_match:
+            content = fence_match.group(1).strip()
         
         # Try to find JSON object in the response
         if not content.startswith("{"):
@@ -206,8 +262,7 @@ Generate the intent JSON (ONLY JSON, no other text):"""
             intent_dict = json.loads(content)
         except json.JSONDecodeError:
             # Last resort: try to find and extract JSON more aggressively
-            import re
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content)
+            json_match = _JSON_BLOCK_RE.search(content[:_MAX_JSON_SCAN_CHARS])
             if json_match:
                 content = json_match.group(0)
                 intent_dict = json.loads(content)
@@ -217,14 +272,11 @@ Generate the intent JSON (ONLY JSON, no other text):"""
         # Validate and parse into typed intent
         intent = _parse_intent(intent_dict)
         
-        # Calculate confidence (simple heuristic: if all required fields present)
-        confidence = 0.9 if _has_required_fields(intent_dict) else 0.5
-        
-        return IntentResponse(intent=intent_dict, confidence=confidence)
+        return IntentResponse(intent=intent.model_dump(), confidence=_confidence(intent))
         
     except json.JSONDecodeError as e:
         # Log the raw response for debugging
-        raw_content = response.choices[0].message.content if 'response' in locals() else "No response received"
+        raw_content = raw_content if 'raw_content' in locals() else "No response received"
         raise ValueError(
             f"Failed to parse LLM response as JSON: {e}\n"
             f"Raw response (first 500 chars): {raw_content[:500]}"
@@ -233,50 +285,39 @@ Generate the intent JSON (ONLY JSON, no other text):"""
         raise ValueError(f"Intent generation failed: {str(e)}")
 
 
+# intent "type" -> model class
+_INTENT_MODELS: Dict[str, type] = {
+    "dataset_overview": DatasetOverviewIntent,
+    "aggregate": AggregateIntent,
+    "compare": CompareIntent,
+    "rank": RankIntent,
+    "clarification_required": ClarificationRequiredIntent,
+}
+
+
 def _parse_intent(intent_dict: Dict[str, Any]) -> Intent:
     """Parse and validate intent dictionary into typed intent."""
     intent_type = intent_dict.get("type")
     
-    if intent_type == "dataset_overview":
-        return DatasetOverviewIntent(**intent_dict)
-    elif intent_type == "aggregate":
-        return AggregateIntent(**intent_dict)
-    elif intent_type == "compare":
-        return CompareIntent(**intent_dict)
-    elif intent_type == "rank":
-        return RankIntent(**intent_dict)
-    elif intent_type == "clarification_required":
-        return ClarificationRequiredIntent(**intent_dict)
-    else:
+    intent_model = _INTENT_MODELS.get(intent_type)
+    if intent_model is None:
         raise ValueError(f"Unknown intent type: {intent_type}")
+    return intent_model(**intent_dict)
 
 
-def _has_required_fields(intent_dict: Dict[str, Any]) -> bool:
-    """Check if intent has all required fields."""
-    intent_type = intent_dict.get("type")
+def _confidence(intent: Intent) -> float:
+    """
+    Score a parsed intent.
     
-    if intent_type == "dataset_overview":
-        return True  # No required fields
-    elif intent_type == "aggregate":
-        # metric_role required for sum/mean/min/max, optional for count
-        agg = intent_dict.get("aggregation", "sum")
-        if agg in ["sum", "mean", "min", "max", "median", "std"]:
-            return intent_dict.get("metric_role") == "metric"
-        return True  # count doesn't require metric_role
-    elif intent_type == "compare":
-        return intent_dict.get("metric_role") == "metric" and intent_dict.get("dimension_role") == "dimension"
-    elif intent_type == "rank":
-        # group_by_role always required, metric_role null for count
-        group_by = intent_dict.get("group_by_role")
-        if group_by not in ["dimension", "timestamp"]:
-            return False
-        agg = intent_dict.get("aggregation", "count")
-        if agg == "count":
-            return intent_dict.get("metric_role") is None
-        else:
-            return intent_dict.get("metric_role") == "metric"
-    elif intent_type == "clarification_required":
-        return True  # message is optional with default
+    Field types, roles and rank grouping are already enforced by the Pydantic
+    models; the one rule they cannot see when metric_role is omitted is that
+    metric_role must match the aggregation.
+    """
+    if not isinstance(intent, (AggregateIntent, RankIntent)):
+        return 0.9  # compare roles are validated; the rest have no required fields
+    if intent.aggregation != "count":
+        consistent = intent.metric_role == "metric"
     else:
-        return False
-
+        # Count totals may still name a metric; ranks by count must not
+        consistent = isinstance(intent, AggregateIntent) or intent.metric_role is None
+    return 0.9 if consistent else 0.5
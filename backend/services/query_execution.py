@@ -4,20 +4,162 @@ Safe Query Execution Service.
 Executes validated SQL queries using DuckDB with safety constraints.
 """
 
-import duckdb
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import logging
+import os
+import re
 import sys
+import threading
+import time
 
 from services.storage import storage
-from services.analyzer import get_dataframe_from_bytes
+from services.analyzer import load_dataset_dataframe, PARQUET_FILENAME
+
+# Optional: Numba JIT for the result value sweep (NumPy fallback if not installed)
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
 
 logger = logging.getLogger(__name__)
 
 
+def _all_finite_numpy(values: np.ndarray) -> bool:
+    """True if no value is NaN or infinite."""
+    return bool(np.isfinite(values).all())
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _all_finite(values: np.ndarray) -> bool:
+        """True if no value is NaN or infinite (stops at the first bad value)."""
+        for i in range(values.size):
+            if not np.isfinite(values[i]):
+                return False
+        return True
+else:
+    _all_finite = _all_finite_numpy
+
+
+# === Dataset Cache ===
+# Loaded tables are reused across queries on the same dataset. Entries are
+# keyed by the stored file's (mtime_ns, size), so a replaced file is reloaded.
+# Only one copy is kept per dataset: the Arrow table when the dataset can be
+# represented in Arrow, otherwise the pandas DataFrame.
+
+DATAFRAME_CACHE_SIZE = 8
+
+
+def _dataset_version(dataset_id: str, dataset_name: str) -> Tuple[int, int]:
+    """Version key of the file load_dataset_dataframe would read."""
+    version = storage.get_file_version(dataset_id, PARQUET_FILENAME)
+    if version is None:
+        version = storage.get_file_version(dataset_id, dataset_name)
+    if version is None:
+        raise ValueError(f"Dataset file {dataset_name} not found for dataset {dataset_id}")
+    return version
+
+
+@lru_cache(maxsize=DATAFRAME_CACHE_SIZE)
+def _load_table_cached(dataset_id: str, dataset_name: str, version: Tuple[int, int]) -> Union[pa.Table, pd.DataFrame]:
+    """
+    Load a dataset once per file version. Shared; must not be mutated.
+    
+    The Parquet copy is read straight into Arrow, which DuckDB scans with its
+    known schema instead of inferring types from pandas on every query. Raw
+    files are parsed with pandas and converted; if the frame can't be
+    represented in Arrow (e.g. mixed-type object columns) the DataFrame is
+    kept instead.
+    """
+    parquet_bytes = storage.get_file(dataset_id, PARQUET_FILENAME)
+    if parquet_bytes:
+        return pq.read_table(pa.BufferReader(parquet_bytes))
+    
+    df = load_dataset_dataframe(dataset_id, dataset_name)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        logger.info(f"Dataset {dataset_id} not convertible to Arrow, using DataFrame: {e}")
+        return df
+
+
+def get_dataset_table(dataset_id: str, dataset_name: str) -> Union[pa.Table, pd.DataFrame]:
+    """Return the (cached) table to register with DuckDB: Arrow if possible, else the DataFrame."""
+    version = _dataset_version(dataset_id, dataset_name)
+    return _load_table_cached(dataset_id, dataset_name, version)
+
+
+# === Shared DuckDB Connection ===
+# One in-memory connection for the process instead of connect/register/close
+# per query. Only the dataset being queried is registered at any time (so a
+# query can never see another dataset), and registration is skipped when the
+# same cached table is already registered. DuckDB connections are not
+# safe for concurrent use, so queries are serialized by a lock. duckdb is
+# imported and the connection opened on the first query, not at import time.
+
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "2GB")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", str(os.cpu_count() or 1)))
+
+_conn_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _get_connection() -> Any:
+    """Open the shared DuckDB connection (caller holds the lock)."""
+    import duckdb
+    
+    conn = duckdb.connect(":memory:")
+    conn.execute(f"SET memory_limit='{DUCKDB_MEMORY_LIMIT}'")
+    conn.execute(f"SET threads={DUCKDB_THREADS}")
+    return conn
+
+# table name -> id() of the table object currently registered under it
+_registered: Dict[str, int] = {}
+
+
+def _register_table(table_name: str, table: Union[pa.Table, pd.DataFrame]) -> None:
+    """Register table as table_name on the shared connection (caller holds the lock)."""
+    if _registered.get(table_name) == id(table):
+        return
+    conn = _get_connection()
+    # Drop whatever else is registered so only this dataset is visible
+    for name in list(_registered):
+        conn.unregister(name)
+        del _registered[name]
+    conn.register(table_name, table)
+    _registered[table_name] = id(table)
+
+
+# === Row Limit ===
+
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)\s*$", re.IGNORECASE)
+
+
+def _limit_query(query: str, max_rows: int) -> str:
+    """
+    Bound the rows DuckDB materializes for a query.
+    
+    Wraps the query with LIMIT max_rows + 1 (the extra row signals truncation)
+    unless it already ends with a LIMIT no larger than max_rows. A ";" left
+    after stripping the trailing one (e.g. "SELECT 1; -- note") can't go
+    inside a subquery, so such queries run unwrapped; the caller's row check
+    still truncates them.
+    """
+    query = query.strip().rstrip(";").rstrip()
+    match = _TRAILING_LIMIT_RE.search(query)
+    if (match and int(match.group(1)) <= max_rows) or ";" in query:
+        return query
+    # The closing paren goes on its own line so a trailing "-- comment" in
+    # the query can't swallow it
+    return f"SELECT * FROM (\n{query}\n) AS _limited LIMIT {max_rows + 1}"
+
+
 class ExecutionResult:
     """Result of query execution."""
     def __init__(
@@ -49,7 +191,7 @@ def execute_query(
     - Memory limits (handled by DuckDB)
     - Read-only mode
     """
-    start_time = datetime.utcnow()
+    start_ns = time.perf_counter_ns()
     
     # Load dataset
     profile_data = storage.get_json(dataset_id, "profile")
@@ -57,57 +199,67 @@ def execute_query(
         raise ValueError(f"Profile for dataset {dataset_id} not found")
     
     dataset_name = profile_data.get("dataset", {}).get("name", "data.csv")
-    dataset_bytes = storage.get_file(dataset_id, dataset_name)
-    if not dataset_bytes:
-        raise ValueError(f"Dataset file {dataset_name} not found")
-    
-    # Load DataFrame
-    df = get_dataframe_from_bytes(dataset_bytes, dataset_name)
-    total_rows = len(df)
     
-    # Create DuckDB connection
-    conn = duckdb.connect()
+    # Load dataset (Parquet copy if available, else original file; cached),
+    # as an Arrow table when possible
+    table = get_dataset_table(dataset_id, dataset_name)
+    total_rows = table.num_rows if isinstance(table, pa.Table) else len(table)
     
-    try:
-        # Register DataFrame as table
-        conn.register(table_name, df)
+    with _conn_lock:
+        # Register DataFrame as table (no-op if already registered)
+        _register_table(table_name, table)
         
         # Execute query with timeout (simplified - actual timeout needs async or threading)
         # For now, we'll rely on DuckDB's internal limits
         try:
-            result_df = conn.execute(query).df()
+            result_df = _get_connection().execute(_limit_query(query, max_rows)).df()
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             raise ValueError(f"Query execution failed: {str(e)}")
-        
-        # Check row limit
-        if len(result_df) > max_rows:
-            result_df = result_df.head(max_rows)
-            logger.warning(f"Query result truncated to {max_rows} rows")
-        
-        # Calculate execution time
-        end_time = datetime.utcnow()
-        execution_time_ms = (end_time - start_time).total_seconds() * 1000
-        
-        # Convert result to structured format
-        result_data = _format_result(result_df, query)
-        
-        # Validate result
-        _validate_result(result_data, total_rows)
-        
-        return ExecutionResult(
-            data=result_data,
-            execution_time_ms=execution_time_ms,
-            rows_returned=len(result_df),
-            metadata={
-                "executed_at": end_time.isoformat(),
-                "total_rows_in_dataset": total_rows,
-                "query": query[:200],  # Truncate for logging
-            }
-        )
-        
-    finally:
-        conn.close()
+    
+    # Check row limit
+    if len(result_df) > max_rows:
+        result_df = result_df.head(max_rows)
+        logger.warning(f"Query result truncated to {max_rows} rows")
+    
+    # Calculate execution time (monotonic clock)
+    execution_time_ms = (time.perf_counter_ns() - start_ns) / 1e6
+    
+    # Convert result to structured format
+    result_data = _format_result(result_df, query)
+    
+    # Validate result
+    _validate_result(result_data, total_rows)
+    
+    return ExecutionResult(
+        data=result_data,
+        execution_time_ms=execution_time_ms,
+        rows_returned=len(result_df),
+        metadata={
+            "executed_at": datetime.utcnow().isoformat(),
+            "total_rows_in_dataset": total_rows,
+            "query": query[:200],  # Truncate for logging
+        }
+    )
+
+
+# SQL keywords that decide the result type, found in one scan of the query
+_SQL_FLAGS_RE = re.compile(r"\b(COUNT|AVG|SUM|MIN|MAX|GROUP\s+BY|ORDER\s+BY|DESC)\b", re.IGNORECASE)
+
+
+def _sql_flags(query: str) -> set:
+    """Result-shaping keywords present in the query ("COUNT", "GROUP BY", ...)."""
+    return {" ".join(m.group(1).upper().split()) for m in _SQL_FLAGS_RE.finditer(query)}
+
+
+def _column_labels(series: pd.Series) -> List[str]:
+    """Column values as display strings (same text as str() on each value)."""
+    return [str(v) for v in series.tolist()]
+
+
+def _column_values(series: pd.Series) -> List[float]:
+    """Column values as floats in one bulk conversion; missing values become 0.0."""
+    return series.to_numpy(dtype=np.float64, na_value=0.0).tolist()
 
 
 def _format_result(df: pd.DataFrame, query: str) -> Dict[str, Any]:
@@ -119,7 +271,7 @@ def _format_result(df: pd.DataFrame, query: str) -> Dict[str, Any]:
         }
     
     # Determine result type based on shape and query
-    query_upper = query.upper()
+    flags = _sql_flags(query)
     
     # Scalar result (single row, single column)
     if len(df) == 1 and len(df.columns) == 1:
@@ -127,7 +279,7 @@ def _format_result(df: pd.DataFrame, query: str) -> Dict[str, Any]:
             col_name = df.columns[0]
             
             # Check if it's a count
-            if "COUNT" in query_upper:
+            if "COUNT" in flags:
                 return {
                     "type": "scalar",
                     "value": float(value) if pd.notna(value) else 0.0,
@@ -135,8 +287,8 @@ def _format_result(df: pd.DataFrame, query: str) -> Dict[str, Any]:
                     "column_name": col_name,
                 }
             # Check if it's an aggregation
-            elif any(agg in query_upper for agg in ["AVG", "SUM", "MIN", "MAX"]):
-                agg_type = "mean" if "AVG" in query_upper else "sum" if "SUM" in query_upper else "min" if "MIN" in query_upper else "max"
+            elif any(agg in flags for agg in ["AVG", "SUM", "MIN", "MAX"]):
+                agg_type = "mean" if "AVG" in flags else "sum" if "SUM" in flags else "min" if "MIN" in flags else "max"
                 return {
                     "type": "scalar",
                     "value": float(value) if pd.notna(value) else 0.0,
@@ -158,44 +310,40 @@ def _format_result(df: pd.DataFrame, query: str) -> Dict[str, Any]:
             return {
                 "type": "time_series",
                 "data": [
-                    {
-                        "time": str(row[first_col]),
-                        "value": float(row[df.columns[1]]) if pd.notna(row[df.columns[1]]) else 0.0
-                    }
-                    for _, row in df.iterrows()
+                    {"time": time, "value": value}
+                    for time, value in zip(_column_labels(df.iloc[:, 0]), _column_values(df.iloc[:, 1]))
                 ],
                 "time_column": first_col,
                 "metric_column": df.columns[1] if len(df.columns) > 1 else None,
             }
     
     # Ranking (has rank or ordered by count/value)
-    if "ORDER BY" in query_upper and "DESC" in query_upper:
+    if "ORDER BY" in flags and "DESC" in flags:
         # Likely a ranking
         if len(df.columns) >= 2:
             return {
                 "type": "ranking",
                 "data": [
-                    {
-                        "group": str(row[df.columns[0]]),
-                        "value": float(row[df.columns[1]]) if pd.notna(row[df.columns[1]]) else 0.0,
-                        "rank": i + 1
-                    }
-                    for i, (_, row) in enumerate(df.iterrows())
+                    {"group": group, "value": value, "rank": rank}
+                    for rank, (group, value) in enumerate(
+                        zip(_column_labels(df.iloc[:, 0]), _column_values(df.iloc[:, 1])),
+                        start=1,
+                    )
                 ],
                 "group_column": df.columns[0],
                 "metric_column": df.columns[1] if len(df.columns) > 1 else None,
             }
     
     # Breakdown (grouped data)
-    if "GROUP BY" in query_upper:
+    if "GROUP BY" in flags:
+        # Positional access: one column even if the query repeats a column name
+        groups = _column_labels(df.iloc[:, 0])
+        values = _column_values(df.iloc[:, 1]) if len(df.columns) > 1 else [0.0] * len(groups)
         return {
             "type": "breakdown",
             "data": [
-                {
-                    "group": str(row[df.columns[0]]),  # Use "group" for consistency
-                    "value": float(row[df.columns[1]]) if len(df.columns) > 1 and pd.notna(row[df.columns[1]]) else 0.0
-                }
-                for _, row in df.iterrows()
+                {"group": group, "value": value}  # Use "group" for consistency
+                for group, value in zip(groups, values)
             ],
             "group_column": df.columns[0],  # Use "group_column" for consistency
             "metric_column": df.columns[1] if len(df.columns) > 1 else None,
@@ -229,12 +377,12 @@ def _validate_result(result_data: Dict[str, Any], total_rows: int) -> None:
         if not isinstance(data, list):
             raise ValueError(f"Expected list data for {result_type}")
         
-        for item in data:
-            if "value" in item:
-                value = item["value"]
-                if isinstance(value, (int, float)):
-                    if not np.isfinite(value):
-                        raise ValueError("Result contains invalid numeric value")
+        values = np.fromiter(
+            (item["value"] for item in data if isinstance(item.get("value"), (int, float))),
+            dtype=np.float64,
+        )
+        if values.size and not _all_finite(values):
+            raise ValueError("Result contains invalid numeric value")
     
     elif result_type == "table":
         data = result_data.get("data", [])
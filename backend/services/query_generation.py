@@ -8,35 +8,49 @@ Input: User question + dataset schema
 Output: Validated SQL query (DuckDB compatible)
 """
 
+import hashlib
 import json
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 import logging
+import orjson
 
-# Load environment variables
-env_path = Path(__file__).parent.parent / ".env"
-if not env_path.exists():
-    env_path = Path(__file__).parent.parent.parent / ".env"
-load_dotenv(env_path)
+# Load environment variables (skipped when the key is already injected, e.g. in production)
+if not os.getenv("GROQ_API_KEY"):
+    env_path = Path(__file__).parent.parent / ".env"
+    if not env_path.exists():
+        env_path = Path(__file__).parent.parent.parent / ".env"
+    load_dotenv(env_path)
 
 from groq import Groq
-from services.groq_client import call_with_fallback
+from services.groq_client import (
+    FAST_MODEL,
+    call_with_fallback,
+    call_with_fallback_async,
+    get_async_groq_client,
+    get_groq_client,
+)
+from services.semantic_resolution import SEMANTIC_CONCEPTS, detect_semantic_concepts
 
-# Initialize Groq client (single-model behavior preserved; model routing is centralized)
-_groq_api_key = os.getenv("GROQ_API_KEY")
-if _groq_api_key:
+logger = logging.getLogger(__name__)
+
+
+# Groq client, created on first use (single-model behavior preserved; model routing is centralized)
+@lru_cache(maxsize=1)
+def get_client() -> Optional[Groq]:
+    """Shared pooled Groq client from groq_client, or None if GROQ_API_KEY is unset or init fails."""
     try:
-        client: Optional[Groq] = Groq(api_key=_groq_api_key)
+        return get_groq_client()
     except Exception as e:
-        logging.warning(f"Failed to initialize Groq client: {e}")
-        client = None
-else:
-    client = None
-
-logger = logging.getLogger(__name__)
+        logging.warning("Failed to initialize Groq client: %s", e)
+        return None
 
 
 class QueryGenerationRequest:
@@ -47,13 +61,16 @@ class QueryGenerationRequest:
         columns: List[Dict[str, Any]],
         total_rows: int,
         table_name: str = "data",
-        semantic_mappings: Optional[Dict[str, str]] = None
+        semantic_mappings: Optional[Dict[str, str]] = None,
+        schema_fingerprint: Optional[str] = None
     ):
         self.question = question
         self.columns = columns
         self.total_rows = total_rows
         self.table_name = table_name
         self.semantic_mappings = semantic_mappings or {}
+        # Optional precomputed _schema_fingerprint(columns); computed on demand if omitted
+        self.schema_fingerprint = schema_fingerprint
 
 
 class QueryGenerationResponse:
@@ -71,97 +88,166 @@ class QueryGenerationResponse:
         self.message = message
 
 
-def generate_query(request: QueryGenerationRequest) -> QueryGenerationResponse:
-    """
-    Generate a SQL query from a natural language question.
-    
-    CRITICAL RULES:
-    - Output ONLY SELECT statements
-    - No DROP, INSERT, UPDATE, DELETE
-    - No subqueries beyond GROUP BY / ORDER BY
-    - No LIMIT > 1000 unless explicitly requested
-    - No imports, file access, network access
-    - Column names come from schema only
-    """
-    if client is None:
-        raise ValueError(
-            "Groq client not initialized. "
-            "Set GROQ_API_KEY environment variable to enable query generation."
+# === Generated Query Cache ===
+# Repeated questions against the same schema and mappings reuse the SQL from
+# the first answer instead of making another LLM call. Only the prompt inputs
+# go into the key; question text is compared after whitespace collapsing
+# (case and punctuation are kept, since they can change literal values).
+
+QUERY_CACHE_SIZE = 512
+QUERY_CACHE_TTL_SECONDS = 3600.0
+
+# cache key -> (stored_at, query, query_type, confidence, message)
+_query_cache: "OrderedDict[str, Tuple[float, str, str, float, Optional[str]]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def _schema_fingerprint(columns: List[Dict[str, Any]]) -> str:
+    """Digest of the column fields that end up in the prompt."""
+    schema = [(col.get("name", ""), col.get("dtype", "text"), col.get("null_count", 0) > 0) for col in columns]
+    return hashlib.blake2b(repr(schema).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _request_fingerprint(request: QueryGenerationRequest) -> str:
+    """Schema fingerprint for a request, computed once and stored on it."""
+    if request.schema_fingerprint is None:
+        request.schema_fingerprint = _schema_fingerprint(request.columns)
+    return request.schema_fingerprint
+
+
+def _query_cache_key(request: QueryGenerationRequest) -> str:
+    """Cache key for a request: question, schema, table, row count and mappings."""
+    question = " ".join(request.question.split()).rstrip("?. ")
+    parts = (
+        question,
+        _request_fingerprint(request),
+        request.table_name,
+        request.total_rows,
+        sorted(request.semantic_mappings.items()),
+    )
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _get_cached_query(key: str) -> Optional[QueryGenerationResponse]:
+    """Return a fresh response for a cached entry, or None on miss/expiry."""
+    with _query_cache_lock:
+        entry = _query_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, query, query_type, confidence, message = entry
+        if time.monotonic() - stored_at > QUERY_CACHE_TTL_SECONDS:
+            del _query_cache[key]
+            return None
+        _query_cache.move_to_end(key)
+    return QueryGenerationResponse(query=query, query_type=query_type, confidence=confidence, message=message)
+
+
+def _cache_query(key: str, response: QueryGenerationResponse) -> None:
+    """Store a response, evicting the least recently used entry when full."""
+    with _query_cache_lock:
+        _query_cache[key] = (
+            time.monotonic(),
+            response.query,
+            response.query_type,
+            response.confidence,
+            response.message,
         )
+        _query_cache.move_to_end(key)
+        if len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+
+# === Schema Prompt Cache ===
+# The JSON column listing in the prompt only depends on the schema, so it is
+# rendered once per schema fingerprint.
+
+SCHEMA_PROMPT_CACHE_SIZE = 64
+
+# Our column dtypes -> SQL types shown to the LLM (anything else is VARCHAR)
+_SQL_TYPES = {
+    "numeric": "NUMERIC",
+    "datetime": "TIMESTAMP",
+    "boolean": "BOOLEAN",
+}
+
+# schema fingerprint -> rendered JSON column listing
+_schema_prompt_cache: Dict[str, str] = {}
+
+
+def _schema_prompt(request: QueryGenerationRequest) -> str:
+    """JSON column listing for the prompt, rendered once per schema."""
+    fingerprint = _request_fingerprint(request)
+    rendered = _schema_prompt_cache.get(fingerprint)
+    if rendered is not None:
+        return rendered
     
-    # Build column schema for LLM
-    column_schema = []
-    for col in request.columns:
-        col_name = col.get("name", "")
-        col_type = col.get("dtype", "text")
-        # Map our types to SQL types
-        if col_type == "numeric":
-            sql_type = "NUMERIC"
-        elif col_type == "datetime":
-            sql_type = "TIMESTAMP"
-        elif col_type == "boolean":
-            sql_type = "BOOLEAN"
-        else:
-            sql_type = "VARCHAR"
-        
-        column_schema.append({
-            "name": col_name,
-            "type": sql_type,
-            "nullable": col.get("null_count", 0) > 0
-        })
+    column_schema = [
+        {
+            "name": col.get("name", ""),
+            "type": _SQL_TYPES.get(col.get("dtype", "text"), "VARCHAR"),
+            "nullable": col.get("null_count", 0) > 0,
+        }
+        for col in request.columns
+    ]
+    rendered = json.dumps(column_schema, indent=2)
     
-    system_prompt = """You are a SQL query generator for a data analysis system.
-
-CRITICAL RULES:
-1. You MUST output ONLY valid SQL (DuckDB compatible)
-2. You MUST use ONLY the columns provided in the schema
-3. You MUST output SELECT statements ONLY
-4. You MUST NOT include:
-   - DROP, INSERT, UPDATE, DELETE
-   - Imports or file operations
-   - Network access
-   - Loops or arbitrary expressions
-   - Subqueries beyond GROUP BY / ORDER BY
-5. LIMIT must be <= 1000 unless user explicitly asks for more
-6. If the question is ambiguous or cannot be answered with SQL, output: {"type": "clarification", "message": "..."}
-7. You MUST use mapped columns when semantic mappings are provided - DO NOT substitute or guess
-8. DO NOT use MIN() or MAX() on categorical/text columns unless explicitly ordered
-9. If you cannot generate correct SQL, return clarification JSON instead of guessing
-
-OUTPUT FORMAT:
-- If you can generate SQL: Output ONLY the SQL query, nothing else
-- If clarification needed: Output JSON: {"type": "clarification", "message": "..."}
+    if len(_schema_prompt_cache) >= SCHEMA_PROMPT_CACHE_SIZE:
+        # Drop the oldest schema (dicts keep insertion order)
+        _schema_prompt_cache.pop(next(iter(_schema_prompt_cache)), None)
+    _schema_prompt_cache[fingerprint] = rendered
+    return rendered
+
+
+_SYSTEM_PROMPT = """You are a SQL query generator for a data analysis system.
+
+RULES:
+1. The "sql" value must be a single DuckDB SELECT statement
+2. Use ONLY the columns in the schema; never guess or use similar-sounding columns
+3. No DROP/INSERT/UPDATE/DELETE, imports, file or network access, loops, or subqueries beyond GROUP BY / ORDER BY
+4. LIMIT <= 1000 unless the user explicitly asks for more
+5. When semantic mappings are provided, use the mapped columns exactly - do not substitute
+6. No MIN()/MAX() on categorical/text columns unless explicitly ordered
+7. If the question is ambiguous or you cannot write correct SQL, ask for clarification instead
+
+OUTPUT: respond ONLY with a JSON object, either {"sql": "SELECT ..."} or {"clarification": "..."}. No explanations, no markdown.
 
 EXAMPLES:
+Q: "How many records are in this dataset?"
+{"sql": "SELECT COUNT(*) as count FROM data"}
 
-Question: "How many records are in this dataset?"
-SQL: SELECT COUNT(*) as count FROM data;
+Q: "Which year has the most records?"
+{"sql": "SELECT EXTRACT(YEAR FROM date_column) as year, COUNT(*) as count FROM data GROUP BY year ORDER BY count DESC LIMIT 1"}
 
-Question: "Which year has the most records?"
-SQL: SELECT EXTRACT(YEAR FROM date_column) as year, COUNT(*) as count FROM data GROUP BY year ORDER BY count DESC LIMIT 1;
+Q: "What is the average revenue?" (mapping: revenue -> total_sales)
+{"sql": "SELECT AVG(total_sales) as average_revenue FROM data"}"""
 
-Question: "Show top 5 categories by count"
-SQL: SELECT category_column, COUNT(*) as count FROM data GROUP BY category_column ORDER BY count DESC LIMIT 5;
 
-Question: "What is the average price?"
-SQL: SELECT AVG(price_column) as average_price FROM data;
+# === Mapping Selection ===
+# Only the mappings for semantic concepts the question mentions (by keyword,
+# e.g. "movies" for title, as detected by semantic resolution) go into the
+# prompt. Mappings for concepts the keyword index doesn't know can't be
+# matched, so they are always kept, as are all mappings if none match.
 
-Question: "What is the average gross revenue of movies?" (with mappings: revenue -> gross_revenue, title -> movie_title)
-SQL: SELECT AVG(gross_revenue) as average_revenue FROM data;
 
-Question: "What is the average revenue?" (with mapping: revenue -> total_sales)
-SQL: SELECT AVG(total_sales) as average_revenue FROM data;
+def _relevant_mappings(mappings: Dict[str, str], question: str) -> Dict[str, str]:
+    """The mappings whose concept the question mentions (all if none)."""
+    if not mappings:
+        return mappings
+    
+    detected = detect_semantic_concepts(question)
+    relevant = {
+        concept: column for concept, column in mappings.items()
+        if concept in detected or concept not in SEMANTIC_CONCEPTS
+    }
+    return relevant or mappings
 
-Remember: 
-- Output ONLY SQL or clarification JSON. No explanations, no markdown, no code blocks.
-- If mappings are provided, you MUST use the mapped column names exactly as specified.
-- Do NOT guess column names or use similar-sounding columns."""
 
-    # Build semantic mappings context if available
+def _mappings_context(mappings: Dict[str, str]) -> str:
+    """Semantic mappings section of the user prompt ("" if there are none)."""
     mappings_context = ""
-    if request.semantic_mappings:
+    if mappings:
         mappings_list = [f"'{concept}' is represented by column '{column}'" 
-                        for concept, column in request.semantic_mappings.items()]
+                        for concept, column in mappings.items()]
         mappings_context = f"\n\n=== SEMANTIC MAPPINGS (MANDATORY) ===\n"
         mappings_context += "\n".join(f"- {m}" for m in mappings_list) + "\n"
         mappings_context += "\nCRITICAL RULES:\n"
@@ -169,13 +255,23 @@ Remember:
         mappings_context += "2. Do NOT use any other column, even if it seems similar.\n"
         mappings_context += "3. If the question asks for 'average revenue' or 'average gross revenue', use AVG() on the mapped revenue column.\n"
         mappings_context += "4. If the question mentions 'movies' or 'films' descriptively (e.g., 'revenue of movies'), you can ignore it unless you need to filter. Focus on the aggregation target.\n"
-        mappings_context += "5. For aggregation questions like 'What is the average X?', generate: SELECT AVG(mapped_column) FROM data;\n"
+        mappings_context += "5. For aggregation questions like 'What is the average X?', generate: SELECT AVG(mapped_column) FROM data\n"
         mappings_context += "6. These mappings are user-provided and must be respected.\n"
         mappings_context += "\nEXAMPLE:\n"
         mappings_context += "Question: 'What is the average gross revenue of movies?'\n"
         mappings_context += "Mapping: revenue -> gross_revenue\n"
-        mappings_context += "SQL: SELECT AVG(gross_revenue) as average_revenue FROM data;\n"
+        mappings_context += '{"sql": "SELECT AVG(gross_revenue) AS average_revenue FROM data"}\n'
         mappings_context += "===============================\n"
+    return mappings_context
+
+
+def _build_messages(request: QueryGenerationRequest) -> List[Dict[str, str]]:
+    """System and user prompt for a request (schema and mappings only, no data)."""
+    mappings_context = _mappings_context(_relevant_mappings(request.semantic_mappings, request.question))
+    if mappings_context:
+        mapping_instruction = "Use the mapped columns from the semantic mappings section above."
+    else:
+        mapping_instruction = "If the question mentions concepts like 'revenue', 'movies', 'genre', etc., you may need to ask for clarification if no mapping exists."
     
     user_prompt = f"""Question: {request.question}
 
@@ -183,78 +279,234 @@ Dataset schema:
 - Table name: {request.table_name}
 - Total rows: {request.total_rows}
 - Columns:
-{json.dumps(column_schema, indent=2)}
+{_schema_prompt(request)}
 {mappings_context}
 Generate a SQL query to answer this question.
 
 INSTRUCTIONS:
 1. Use ONLY the columns listed in the schema above.
-2. {mappings_context and "You MUST use the mapped columns from the semantic mappings section above. For example, if the question mentions 'revenue' or 'gross revenue', use the mapped revenue column. If it mentions 'movies', use the mapped title column." or "If the question mentions concepts like 'revenue', 'movies', 'genre', etc., you may need to ask for clarification if no mapping exists."}
+2. {mapping_instruction}
 3. Generate valid SQL that answers the question directly.
-4. If you cannot generate correct SQL, return: {{"type": "clarification", "message": "..."}}
+4. If you cannot generate correct SQL, return: {{"clarification": "..."}}
+
+Output ONLY the JSON object: {{"sql": "SELECT ..."}} or {{"clarification": "..."}}."""
+
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+# Completions are requested in JSON mode, so every reply is a single JSON object
+_JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# The prompts' placeholder table, in any case/spacing ("from  data", "FROM data")
+_FROM_DATA_RE = re.compile(r"\bFROM\s+data\b", re.IGNORECASE)
+
+
+def _parse_generated_query(
+    content: str,
+    request: QueryGenerationRequest,
+    cache_key: str,
+) -> QueryGenerationResponse:
+    """Turn the LLM's JSON reply into a SQL or clarification response (and cache SQL)."""
+    try:
+        reply = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        reply = None
+    if not isinstance(reply, dict):
+        reply = {"sql": ""}  # Unusable reply, same answer as non-SELECT SQL
+    return _response_from_reply(reply, request, cache_key)
+
+
+def _response_from_reply(
+    reply: Dict[str, Any],
+    request: QueryGenerationRequest,
+    cache_key: str,
+) -> QueryGenerationResponse:
+    """Build the response for one parsed {"sql": ...} / {"clarification": ...} reply."""
+    sql = reply.get("sql")
+    if not isinstance(sql, str):
+        # Check if it's a clarification request
+        message = reply.get("clarification")
+        return QueryGenerationResponse(
+            query="",
+            query_type="clarification",
+            confidence=0.5,
+            message=message if isinstance(message, str) else "Please clarify your question."
+        )
+    
+    sql = sql.strip().rstrip(";").rstrip()
+    
+    # Basic validation: must start with SELECT
+    if sql[:6].upper() != "SELECT":
+        return QueryGenerationResponse(
+            query="",
+            query_type="clarification",
+            confidence=0.0,
+            message="I couldn't generate a valid query. Please rephrase your question."
+        )
+    
+    # Replace table name placeholder if needed
+    if request.table_name != "data":
+        from_table = f"FROM {request.table_name}"
+        sql = _FROM_DATA_RE.sub(lambda _: from_table, sql)
+    
+    logger.info("Generated SQL query: %.200s...", sql)
+    
+    result = QueryGenerationResponse(
+        query=sql,
+        query_type="sql",
+        confidence=0.9
+    )
+    # Only SQL answers are cached; clarifications can be retried
+    _cache_query(cache_key, result)
+    return result
+
+
+# === Model Tiering ===
+# Short, single-concept questions (counts, one average, a top-N) go to the
+# low-latency model first. If it doesn't come back with SQL, the question is
+# asked again with the default model order.
 
-Output ONLY the SQL query (or clarification JSON if needed)."""
+FAST_QUESTION_MAX_CHARS = 80
+FAST_QUESTION_MAX_MAPPINGS = 1
 
+# Wording that usually needs multi-step SQL
+_COMPLEX_QUESTION_RE = re.compile(
+    r"\b(?:join|window|compare|comparison|versus|vs|trend|trends|over time|growth|change|correlat\w*)\b",
+    re.IGNORECASE,
+)
+
+
+def _choose_model(request: QueryGenerationRequest) -> Optional[str]:
+    """FAST_MODEL for simple questions, None for the default model order."""
+    question = request.question
+    if len(question) >= FAST_QUESTION_MAX_CHARS:
+        return None
+    if len(request.semantic_mappings) > FAST_QUESTION_MAX_MAPPINGS:
+        return None
+    if _COMPLEX_QUESTION_RE.search(question):
+        return None
+    return FAST_MODEL
+
+
+def _check_cache(request: QueryGenerationRequest) -> Tuple[str, Optional[QueryGenerationResponse]]:
+    """Cache key for the request and the cached response, if any."""
+    cache_key = _query_cache_key(request)
+    cached = _get_cached_query(cache_key)
+    if cached is not None:
+        logger.info("Query cache hit")
+    return cache_key, cached
+
+
+def generate_query(request: QueryGenerationRequest) -> QueryGenerationResponse:
+    """
+    Generate a SQL query from a natural language question.
+    
+    CRITICAL RULES:
+    - Output ONLY SELECT statements
+    - No DROP, INSERT, UPDATE, DELETE
+    - No subqueries beyond GROUP BY / ORDER BY
+    - No LIMIT > 1000 unless explicitly requested
+    - No imports, file access, network access
+    - Column names come from schema only
+    """
+    client = get_client()
+    if client is None:
+        raise ValueError(
+            "Groq client not initialized. "
+            "Set GROQ_API_KEY environment variable to enable query generation."
+        )
+    
+    cache_key, cached = _check_cache(request)
+    if cached is not None:
+        return cached
+    
+    messages = _build_messages(request)
+    preferred_model = _choose_model(request)
+    
     try:
         response = call_with_fallback(
             client,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
             temperature=0.1,  # Low temperature for deterministic output
             max_tokens=500,
+            preferred_model=preferred_model,
+            response_format=_JSON_RESPONSE_FORMAT,
         )
         
-        content = response.choices[0].message.content.strip()
-        
-        # Check if it's a clarification request
-        if content.startswith("{") and "clarification" in content.lower():
-            try:
-                clarification = json.loads(content)
-                return QueryGenerationResponse(
-                    query="",
-                    query_type="clarification",
-                    confidence=0.5,
-                    message=clarification.get("message", "Please clarify your question.")
-                )
-            except json.JSONDecodeError:
-                # Fall through to SQL parsing
-                pass
+        content = response.choices[0].message.content
+        result = _parse_generated_query(content, request, cache_key)
+        if preferred_model is None or result.query_type == "sql":
+            return result
         
-        # Extract SQL from markdown code blocks if present
-        sql_match = re.search(r"```sql\n(.*?)\n```", content, re.DOTALL)
-        if sql_match:
-            sql = sql_match.group(1).strip()
-        else:
-            # Try to find SQL without code blocks
-            sql = content.strip()
-            # Remove any leading/trailing markdown or explanations
-            sql = re.sub(r"^.*?(SELECT)", r"\1", sql, flags=re.IGNORECASE | re.DOTALL)
-            sql = sql.split(";")[0].strip()  # Take first statement
+        logger.info("Fast model returned no SQL, retrying with the default model order")
+        response = call_with_fallback(
+            client,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=500,
+            response_format=_JSON_RESPONSE_FORMAT,
+        )
         
-        # Basic validation: must start with SELECT
-        if not sql.upper().startswith("SELECT"):
-            return QueryGenerationResponse(
-                query="",
-                query_type="clarification",
-                confidence=0.0,
-                message="I couldn't generate a valid query. Please rephrase your question."
-            )
+        content = response.choices[0].message.content
+        return _parse_generated_query(content, request, cache_key)
         
-        # Replace table name placeholder if needed
-        sql = sql.replace("FROM data", f"FROM {request.table_name}")
-        sql = sql.replace("from data", f"from {request.table_name}")
+    except Exception as e:
+        logger.error("Query generation failed: %s", e)
+        raise ValueError(f"Query generation failed: {str(e)}")
+
+
+async def generate_query_async(request: QueryGenerationRequest) -> QueryGenerationResponse:
+    """
+    Async variant of generate_query for callers running on the event loop.
+    
+    Uses the shared AsyncGroq client, so concurrent generations wait on the
+    network without holding a worker thread each. Same prompt, cache, model
+    tiering and response handling as generate_query.
+    """
+    async_client = get_async_groq_client()
+    if async_client is None:
+        raise ValueError(
+            "Groq client not initialized. "
+            "Set GROQ_API_KEY environment variable to enable query generation."
+        )
+    
+    cache_key, cached = _check_cache(request)
+    if cached is not None:
+        return cached
+    
+    messages = _build_messages(request)
+    preferred_model = _choose_model(request)
+    
+    try:
+        response = await call_with_fallback_async(
+            async_client,
+            messages=messages,
+            temperature=0.1,  # Low temperature for deterministic output
+            max_tokens=500,
+            preferred_model=preferred_model,
+            response_format=_JSON_RESPONSE_FORMAT,
+        )
         
-        logger.info(f"Generated SQL query: {sql[:200]}...")
+        content = response.choices[0].message.content
+        result = _parse_generated_query(content, request, cache_key)
+        if preferred_model is None or result.query_type == "sql":
+            return result
         
-        return QueryGenerationResponse(
-            query=sql,
-            query_type="sql",
-            confidence=0.9
+        logger.info("Fast model returned no SQL, retrying with the default model order")
+        response = await call_with_fallback_async(
+            async_client,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=500,
+            response_format=_JSON_RESPONSE_FORMAT,
         )
         
+        content = response.choices[0].message.content
+        return _parse_generated_query(content, request, cache_key)
+        
     except Exception as e:
-        logger.error(f"Query generation failed: {e}")
+        logger.error("Query generation failed: %s", e)
         raise ValueError(f"Query generation failed: {str(e)}")
-
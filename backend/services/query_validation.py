@@ -5,12 +5,157 @@ Validates SQL queries before execution to ensure safety.
 """
 
 import re
+import threading
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Tuple
 import logging
 
+import sqlglot
+from sqlglot import exp
+
 logger = logging.getLogger(__name__)
 
 
+# === Precompiled Patterns ===
+# All fixed patterns are compiled once at import. They run against the
+# query upper-cased once per call, so none of them needs re.IGNORECASE.
+
+FORBIDDEN_KEYWORDS = [
+    "DROP", "DELETE", "INSERT", "UPDATE", "ALTER", "CREATE",
+    "TRUNCATE", "REPLACE", "MERGE", "COPY", "IMPORT", "EXPORT"
+]
+
+# (pattern text for the error message, compiled pattern)
+_DANGEROUS_PATTERNS: List[Tuple[str, "re.Pattern[str]"]] = [
+    (pattern, re.compile(pattern))
+    for pattern in [
+        r"EXEC\s*\(",  # Execute
+        r"EVAL\s*\(",  # Eval
+        r"LOAD\s*\(",  # Load
+        r"READ\s*FILE",  # File read
+        r"WRITE\s*FILE",  # File write
+        r"HTTP",  # Network
+        r"CURL",  # Network
+    ]
+]
+
+# Single-pass screens: one scan finds whether ANY forbidden keyword (plain
+# substring, as before) or dangerous pattern occurs. Only on a hit are the
+# lists walked in order to name the offending entry in the error message.
+_FORBIDDEN_ANY_RE = re.compile("|".join(re.escape(keyword) for keyword in FORBIDDEN_KEYWORDS))
+_DANGEROUS_ANY_RE = re.compile("|".join(f"(?:{pattern})" for pattern, _ in _DANGEROUS_PATTERNS))
+
+
+@lru_cache(maxsize=256)
+def _parse_sql(query: str) -> Optional[exp.Expression]:
+    """
+    Parse a query once with sqlglot (DuckDB dialect); None if unparseable.
+    
+    The tree is cached and shared between calls, so it must not be modified.
+    """
+    try:
+        return sqlglot.parse_one(query, read="duckdb")
+    except sqlglot.errors.SqlglotError:
+        return None
+
+
+def _ast_limit(tree: Any) -> Optional[int]:
+    """Outermost integer LIMIT in the tree, if any."""
+    limit = tree.find(exp.Limit)
+    if limit is None:
+        return None
+    value = limit.expression
+    if isinstance(value, exp.Literal) and value.is_int:
+        return int(value.this)
+    return None
+
+
+def _ast_group_by_columns(tree: Any) -> set:
+    """Upper-cased names of the columns used in the outermost GROUP BY."""
+    group = tree.find(exp.Group)
+    if group is None:
+        return set()
+    return {column.name.upper() for column in group.find_all(exp.Column)}
+
+
+# === DuckDB Plan Check ===
+# After the cheap checks, DuckDB plans the query (EXPLAIN, never executed)
+# against an empty table with the dataset's schema. Its own parser and
+# binder catch syntax errors, unknown columns/tables and unknown functions
+# before execution. Type mismatches are left to execution, since profiled
+# dtypes only approximate the stored column types.
+
+# Profiled dtypes -> DuckDB types for the empty schema table (anything else is VARCHAR)
+_DUCKDB_TYPES = {
+    "numeric": "DOUBLE",
+    "datetime": "TIMESTAMP",
+    "boolean": "BOOLEAN",
+}
+
+SCHEMA_CONNECTION_CACHE_SIZE = 16
+
+# Binder errors that mean a referenced column doesn't exist
+_MISSING_COLUMN_MARKERS = ("not found", "does not have a column")
+
+# ((column, dtype), ...) in allowed_columns order
+_Schema = Tuple[Tuple[str, str], ...]
+
+# Schema connections are shared between request threads
+_plan_lock = threading.Lock()
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=SCHEMA_CONNECTION_CACHE_SIZE)
+def _schema_connection(table_name: str, schema: _Schema) -> Optional[Any]:
+    """In-memory DuckDB database with one empty table of this schema (None if it can't be built)."""
+    import duckdb
+    
+    try:
+        conn = duckdb.connect(":memory:")
+        # Binding table functions like read_csv would otherwise touch files
+        conn.execute("SET enable_external_access = false")
+        columns_sql = ", ".join(
+            f"{_quote_identifier(name)} {_DUCKDB_TYPES.get(dtype, 'VARCHAR')}" for name, dtype in schema
+        )
+        conn.execute(f"CREATE TABLE {_quote_identifier(table_name)} ({columns_sql})")
+        return conn
+    except duckdb.Error as e:
+        # e.g. column names that differ only by case
+        logger.info("Skipping DuckDB plan check for this schema: %s", e)
+        return None
+
+
+def _plan_error(query: str, table_name: str, schema: _Schema) -> Optional[str]:
+    """DuckDB's parse/bind error for the query, or None if it plans (or can't be checked)."""
+    statement = query.strip().rstrip(";")
+    if not schema or ";" in statement:
+        # No schema to bind against, or possibly several statements: leave to execution
+        return None
+    try:
+        import duckdb
+    except ImportError:  # pragma: no cover - duckdb is a hard dependency
+        return None
+    
+    with _plan_lock:
+        conn = _schema_connection(table_name, schema)
+        if conn is None:
+            return None
+        try:
+            conn.execute(f"EXPLAIN {statement}")
+        except (duckdb.ParserException, duckdb.CatalogException) as e:
+            return str(e)
+        except duckdb.BinderException as e:
+            # Unknown columns are definite; type errors may be profiling artifacts
+            message = str(e)
+            return message if any(marker in message for marker in _MISSING_COLUMN_MARKERS) else None
+        except duckdb.Error:
+            return None
+    return None
+
+
 class ValidationResult:
     """Result of query validation."""
     def __init__(
@@ -24,10 +169,69 @@ class ValidationResult:
         self.warnings = warnings or []
 
 
+# === Result Cache ===
+# Validation is deterministic in (query, columns, table, column stats), and
+# the same generated SQL is often validated again (retries, re-execution).
+# Results are cached as immutable tuples and a fresh ValidationResult is
+# built per call, so callers can't alter a cached warnings list.
+
+VALIDATION_CACHE_SIZE = 1024
+
+# ((column, null_count, total_rows), ...) in column_info order
+_ColumnInfoKey = Tuple[Tuple[str, Any, Any], ...]
+
+
 def validate_query(
     query: str,
     allowed_columns: List[str],
     table_name: str = "data",
+    column_info: Optional[Dict[str, Dict[str, Any]]] = None,
+    column_types: Optional[Dict[str, str]] = None
+) -> ValidationResult:
+    """
+    Validate a SQL query for safety (cached; see _validate_uncached for the checks).
+    
+    column_types maps column names to profiled dtypes ("numeric", "datetime",
+    ...) for the DuckDB plan check; columns without one are planned as VARCHAR.
+    """
+    column_types = column_types or {}
+    schema: _Schema = tuple((col, column_types.get(col, "text")) for col in allowed_columns)
+    
+    column_info_key: Optional[_ColumnInfoKey] = None
+    if column_info is not None:
+        column_info_key = tuple(
+            (name, info.get("null_count", 0), info.get("total_rows", 0))
+            for name, info in column_info.items()
+        )
+    
+    is_valid, error_message, warnings = _validate_cached(query, schema, table_name, column_info_key)
+    if is_valid:
+        logger.info("Query validation: valid=True, warnings=%d", len(warnings))
+    return ValidationResult(is_valid=is_valid, error_message=error_message, warnings=list(warnings))
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _validate_cached(
+    query: str,
+    schema: _Schema,
+    table_name: str,
+    column_info_key: Optional[_ColumnInfoKey],
+) -> Tuple[bool, Optional[str], Tuple[str, ...]]:
+    """Memoized validation; only null_count / total_rows of column_info are used."""
+    column_info = None
+    if column_info_key is not None:
+        column_info = {
+            name: {"null_count": null_count, "total_rows": total_rows}
+            for name, null_count, total_rows in column_info_key
+        }
+    result = _validate_uncached(query, schema, table_name, column_info)
+    return result.is_valid, result.error_message, tuple(result.warnings)
+
+
+def _validate_uncached(
+    query: str,
+    schema: _Schema,
+    table_name: str = "data",
     column_info: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> ValidationResult:
     """
@@ -37,6 +241,7 @@ def validate_query(
     - Only SELECT statements
     - Only references known columns
     - No dangerous operations
+    - Parses and binds in DuckDB against the schema
     - No unbounded scans
     - Reasonable LIMIT
     """
@@ -46,16 +251,13 @@ def validate_query(
     query_upper = query.upper().strip()
     
     # 1. Must be SELECT only
-    forbidden_keywords = [
-        "DROP", "DELETE", "INSERT", "UPDATE", "ALTER", "CREATE",
-        "TRUNCATE", "REPLACE", "MERGE", "COPY", "IMPORT", "EXPORT"
-    ]
-    for keyword in forbidden_keywords:
-        if keyword in query_upper:
-            return ValidationResult(
-                is_valid=False,
-                error_message=f"Query contains forbidden keyword: {keyword}"
-            )
+    if _FORBIDDEN_ANY_RE.search(query_upper):
+        for keyword in FORBIDDEN_KEYWORDS:
+            if keyword in query_upper:
+                return ValidationResult(
+                    is_valid=False,
+                    error_message=f"Query contains forbidden keyword: {keyword}"
+                )
     
     # 2. Must start with SELECT
     if not query_upper.startswith("SELECT"):
@@ -65,55 +267,38 @@ def validate_query(
         )
     
     # 3. Check for dangerous functions
-    dangerous_patterns = [
-        r"EXEC\s*\(",  # Execute
-        r"EVAL\s*\(",  # Eval
-        r"LOAD\s*\(",  # Load
-        r"READ\s*FILE",  # File read
-        r"WRITE\s*FILE",  # File write
-        r"HTTP",  # Network
-        r"CURL",  # Network
-    ]
-    for pattern in dangerous_patterns:
-        if re.search(pattern, query_upper):
-            return ValidationResult(
-                is_valid=False,
-                error_message=f"Query contains potentially dangerous operation: {pattern}"
-            )
+    if _DANGEROUS_ANY_RE.search(query_upper):
+        for pattern, pattern_re in _DANGEROUS_PATTERNS:
+            if pattern_re.search(query_upper):
+                return ValidationResult(
+                    is_valid=False,
+                    error_message=f"Query contains potentially dangerous operation: {pattern}"
+                )
     
-    # 4. Extract column references
-    # Simple extraction: look for column names after SELECT, FROM, WHERE, GROUP BY, ORDER BY
-    # This is a simplified check - in production, use a proper SQL parser
-    column_refs = set()
-    
-    # Extract column names from SELECT clause
-    select_match = re.search(r"SELECT\s+(.*?)\s+FROM", query_upper, re.DOTALL)
-    if select_match:
-        select_clause = select_match.group(1)
-        # Extract column names (handle aliases, functions, etc.)
-        # This is simplified - real parser would be better
-        for col in allowed_columns:
-            col_upper = col.upper()
-            # Check if column is referenced (as identifier, not in string)
-            pattern = r"\b" + re.escape(col_upper) + r"\b"
-            if re.search(pattern, select_clause):
-                column_refs.add(col)
-    
-    # Extract from WHERE, GROUP BY, ORDER BY
-    for clause in ["WHERE", "GROUP BY", "ORDER BY", "HAVING"]:
-        clause_match = re.search(rf"{clause}\s+(.*?)(?:\s+(?:FROM|LIMIT|$))", query_upper, re.DOTALL | re.IGNORECASE)
-        if clause_match:
-            clause_content = clause_match.group(1)
-            for col in allowed_columns:
-                col_upper = col.upper()
-                pattern = r"\b" + re.escape(col_upper) + r"\b"
-                if re.search(pattern, clause_content):
-                    column_refs.add(col)
-    
-    # 5. Check LIMIT
-    limit_match = re.search(r"LIMIT\s+(\d+)", query_upper)
-    if limit_match:
-        limit_value = int(limit_match.group(1))
+    # Parse once; every check below reads the AST
+    tree = _parse_sql(query)
+    if tree is None:
+        return ValidationResult(
+            is_valid=False,
+            error_message="Query could not be parsed"
+        )
+    if not isinstance(tree, (exp.Select, exp.Union)):
+        return ValidationResult(
+            is_valid=False,
+            error_message="Query must be a SELECT statement"
+        )
+    
+    # DuckDB parse + bind against an empty table with the same schema
+    plan_error = _plan_error(query, table_name, schema)
+    if plan_error is not None:
+        return ValidationResult(
+            is_valid=False,
+            error_message=f"Query failed DuckDB validation: {plan_error}"
+        )
+    
+    # 4. Check LIMIT
+    limit_value = _ast_limit(tree)
+    if limit_value is not None:
         if limit_value > 1000:
             warnings.append(f"LIMIT is very large ({limit_value}), may be slow")
         if limit_value > 10000:
@@ -126,47 +311,42 @@ def validate_query(
         if "GROUP BY" not in query_upper and "COUNT(*)" not in query_upper:
             warnings.append("Query has no LIMIT and may return many rows")
     
-    # 6. Check for Cartesian products (simplified)
-    from_count = len(re.findall(r"\bFROM\s+", query_upper))
+    # 5. Check for Cartesian products (simplified)
+    from_count = sum(1 for _ in tree.find_all(exp.From))
+    has_join = tree.find(exp.Join) is not None
     if from_count > 1:
         # Multiple FROM clauses might indicate joins
         # Check for explicit JOINs
-        if "JOIN" not in query_upper:
+        if not has_join:
             warnings.append("Query may produce Cartesian product (multiple FROM without JOIN)")
     
-    # 7. Validate table name
-    if table_name not in query_upper:
-        # Table name might be aliased, check for FROM clause
-        if f"FROM {table_name.upper()}" not in query_upper and f"FROM {table_name}" not in query_upper:
-            warnings.append(f"Table name '{table_name}' not found in query")
+    # 6. Validate table name
+    if table_name.upper() not in {table.name.upper() for table in tree.find_all(exp.Table)}:
+        warnings.append(f"Table name '{table_name}' not found in query")
     
-    # 8. Check for NULL validity in grouping columns (if column_info provided)
+    # 7. Check for NULL validity in grouping columns (if column_info provided)
     if column_info:
-        # Extract GROUP BY columns
-        group_by_match = re.search(r"GROUP\s+BY\s+(.*?)(?:\s+(?:ORDER|LIMIT|$))", query_upper, re.DOTALL | re.IGNORECASE)
-        if group_by_match:
-            group_by_clause = group_by_match.group(1)
-            # Extract column names from GROUP BY
-            for col_name in allowed_columns:
-                col_upper = col_name.upper()
-                if col_upper in group_by_clause:
-                    col_data = column_info.get(col_name, {})
-                    null_count = col_data.get("null_count", 0)
-                    # Try to get total_rows from first column or estimate
-                    total_rows = col_data.get("total_rows", 0)
-                    if total_rows == 0:
-                        # Estimate from other columns
-                        for other_col in column_info.values():
-                            if other_col.get("total_rows", 0) > 0:
-                                total_rows = other_col.get("total_rows", 0)
-                                break
-                    
-                    if total_rows > 0:
-                        null_percentage = (null_count / total_rows * 100)
-                        if null_percentage > 50:
-                            warnings.append(f"Grouping column '{col_name}' has {null_percentage:.1f}% NULL values, results may be misleading")
-    
-    logger.info(f"Query validation: valid=True, warnings={len(warnings)}")
+        # Upper-cased GROUP BY columns (exact names from the AST)
+        grouped = _ast_group_by_columns(tree)
+        if grouped:
+            column_info_upper = {name.upper(): (name, info) for name, info in column_info.items()}
+            # Row count for columns that don't carry their own (first known total)
+            fallback_total_rows = next(
+                (info.get("total_rows", 0) for info in column_info.values() if info.get("total_rows", 0) > 0),
+                0,
+            )
+            for col_upper in sorted(grouped):
+                entry = column_info_upper.get(col_upper)
+                if entry is None:
+                    continue
+                col_name, col_data = entry
+                null_count = col_data.get("null_count", 0)
+                total_rows = col_data.get("total_rows", 0) or fallback_total_rows
+                
+                if total_rows > 0:
+                    null_percentage = (null_count / total_rows * 100)
+                    if null_percentage > 50:
+                        warnings.append(f"Grouping column '{col_name}' has {null_percentage:.1f}% NULL values, results may be misleading")
     
     return ValidationResult(
         is_valid=True,
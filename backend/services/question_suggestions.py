@@ -7,7 +7,9 @@ Rules:
 - No business semantics; all phrasing is generic.
 """
 
-from typing import Dict, List, Optional
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 
 from models.schemas import (
     DatasetProfile,
@@ -27,19 +29,27 @@ PRIORITY_ORDER = {
 }
 
 
-def _split_roles(profile: DatasetProfile) -> Dict[str, List[str]]:
+# (name, dtype, unique_count, null_count) per column, in profile order
+_ColumnKey = Tuple[str, str, int, int]
+
+
+def _classify_roles(columns: Tuple[_ColumnKey, ...], total_rows: int) -> Dict[str, str]:
+    """Structural role per column name, classified once per call."""
+    return {
+        name: classify_column_role(dtype=dtype, unique_count=unique_count, total_rows=total_rows)
+        for name, dtype, unique_count, _ in columns
+    }
+
+
+def _split_roles(columns: Tuple[_ColumnKey, ...], role_map: Dict[str, str]) -> Dict[str, List[str]]:
     """Partition columns by structural role using existing classification."""
     time_cols: List[str] = []
     category_cols: List[str] = []
     numeric_cols: List[str] = []
     # id columns ignored for EDA
 
-    total_rows = profile.dataset.rows
-    for col in profile.columns:
-        dtype = col.dtype
-        unique_count = col.unique_count
-        role = classify_column_role(dtype=dtype, unique_count=unique_count, total_rows=total_rows)
-        name = col.name
+    for name, _, _, _ in columns:
+        role = role_map[name]
 
         if role == "timestamp":
             time_cols.append(name)
@@ -59,101 +69,92 @@ def _has_health_issues(health: Optional[HealthCheckResult]) -> bool:
     return bool(health and health.issues)
 
 
-def _time_templates(column: str) -> List[SuggestedQuestion]:
-    return [
-        SuggestedQuestion(
-            id=f"time_records_per_{column}",
-            text=f"How many records are added per {column}?",
-            column=column,
-            type="time",
-        ),
-        SuggestedQuestion(
-            id=f"time_change_{column}",
-            text=f"How does the number of records change over {column}?",
-            column=column,
-            type="time",
-        ),
-        SuggestedQuestion(
-            id=f"time_spikes_{column}",
-            text=f"Are there spikes or drops over {column}?",
-            column=column,
-            type="time",
-        ),
-    ]
-
-
-def _category_templates(column: str) -> List[SuggestedQuestion]:
-    return [
-        SuggestedQuestion(
-            id=f"cat_freq_{column}",
-            text=f"Which {column} values appear most frequently?",
-            column=column,
-            type="category",
-        ),
-        SuggestedQuestion(
-            id=f"cat_concentration_{column}",
-            text=f"Are records heavily concentrated in a few {column} values?",
-            column=column,
-            type="category",
-        ),
-        SuggestedQuestion(
-            id=f"cat_counts_{column}",
-            text=f"How many records exist per {column}?",
-            column=column,
-            type="category",
-        ),
-    ]
+# Question templates per type: (id, text) format pairs, "{c}" is the column name
+_TIME_TEMPLATES = (
+    ("time_records_per_{c}", "How many records are added per {c}?"),
+    ("time_change_{c}", "How does the number of records change over {c}?"),
+    ("time_spikes_{c}", "Are there spikes or drops over {c}?"),
+)
+_CATEGORY_TEMPLATES = (
+    ("cat_freq_{c}", "Which {c} values appear most frequently?"),
+    ("cat_concentration_{c}", "Are records heavily concentrated in a few {c} values?"),
+    ("cat_counts_{c}", "How many records exist per {c}?"),
+)
+_NUMERIC_TEMPLATES = (
+    ("num_distribution_{c}", "What is the distribution of {c}?"),
+    ("num_extremes_{c}", "Are there extreme values in {c}?"),
+)
+# Only when the dataset has a time column
+_NUMERIC_TIME_TEMPLATES = (
+    ("num_over_time_{c}", "How does {c} vary over time?"),
+)
+# Only when the column has missing values
+_QUALITY_MISSING_TEMPLATES = (
+    ("quality_missing_{c}", "How many records have missing values in {c}?"),
+)
+# Rare/infrequent values: only meaningful for category columns
+# We include the question; executability is ensured by role filter elsewhere.
+_QUALITY_TEMPLATES = (
+    ("quality_rare_{c}", "Does {c} contain rare or infrequent values?"),
+)
 
 
-def _numeric_templates(column: str, has_time: bool) -> List[SuggestedQuestion]:
-    questions = [
-        SuggestedQuestion(
-            id=f"num_distribution_{column}",
-            text=f"What is the distribution of {column}?",
-            column=column,
-            type="numeric",
-        ),
-        SuggestedQuestion(
-            id=f"num_extremes_{column}",
-            text=f"Are there extreme values in {column}?",
-            column=column,
-            type="numeric",
-        ),
-    ]
-    if has_time:
-        questions.append(
-            SuggestedQuestion(
-                id=f"num_over_time_{column}",
-                text=f"How does {column} vary over time?",
-                column=column,
-                type="numeric",
-            )
-        )
-    return questions
-
-
-def _quality_templates(column: str, has_missing: bool) -> List[SuggestedQuestion]:
-    questions: List[SuggestedQuestion] = []
-    if has_missing:
-        questions.append(
-            SuggestedQuestion(
-                id=f"quality_missing_{column}",
-                text=f"How many records have missing values in {column}?",
-                column=column,
-                type="quality",
-            )
-        )
-    # Rare/infrequent values: only meaningful for category columns
-    # We include the question; executability is ensured by role filter elsewhere.
-    questions.append(
-        SuggestedQuestion(
-            id=f"quality_rare_{column}",
-            text=f"Does {column} contain rare or infrequent values?",
+def _expand(
+    templates: Tuple[Tuple[str, str], ...],
+    column: str,
+    question_type: str,
+) -> Tuple[SuggestedQuestion, ...]:
+    """
+    Instantiate templates for one column.
+    
+    Questions are built with model_construct: every field is a str from a
+    fixed template and the type is a literal, so pydantic validation has
+    nothing to check.
+    """
+    return tuple(
+        SuggestedQuestion.model_construct(
+            id=id_format.format(c=column),
+            text=text_format.format(c=column),
             column=column,
-            type="quality",
+            type=question_type,
         )
+        for id_format, text_format in templates
     )
-    return questions
+
+
+# Template questions depend only on the column name (and a flag), so each
+# helper is memoized; the cached tuples are shared across calls and never
+# mutated. The bound keeps memory flat across many datasets.
+TEMPLATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _time_templates(column: str) -> Tuple[SuggestedQuestion, ...]:
+    return _expand(_TIME_TEMPLATES, column, "time")
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _category_templates(column: str) -> Tuple[SuggestedQuestion, ...]:
+    return _expand(_CATEGORY_TEMPLATES, column, "category")
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _numeric_templates(column: str, has_time: bool) -> Tuple[SuggestedQuestion, ...]:
+    templates = _NUMERIC_TEMPLATES + (_NUMERIC_TIME_TEMPLATES if has_time else ())
+    return _expand(templates, column, "numeric")
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _quality_templates(column: str, has_missing: bool) -> Tuple[SuggestedQuestion, ...]:
+    templates = (_QUALITY_MISSING_TEMPLATES if has_missing else ()) + _QUALITY_TEMPLATES
+    return _expand(templates, column, "quality")
+
+
+# Suggestions depend only on the dataset id, row count, the column fields in
+# _ColumnKey and whether health issues exist, so repeated requests for an
+# unchanged profile reuse the finished result (a changed profile changes
+# the key).
+SUGGESTION_CACHE_SIZE = 256
 
 
 def suggest_questions(
@@ -169,17 +170,32 @@ def suggest_questions(
     4) Rank by priority: time > category > quality > numeric.
     5) Return all questions in deterministic order (frontend can show top 4 by default).
     """
-    roles = _split_roles(dataset_profile)
+    columns = tuple(
+        (col.name, col.dtype, col.unique_count, col.null_count)
+        for col in dataset_profile.columns
+    )
+    return _suggest_cached(
+        dataset_profile.dataset.id,
+        dataset_profile.dataset.rows,
+        columns,
+        _has_health_issues(health_result),
+    )
+
+
+@lru_cache(maxsize=SUGGESTION_CACHE_SIZE)
+def _suggest_cached(
+    dataset_id: str,
+    total_rows: int,
+    columns: Tuple[_ColumnKey, ...],
+    has_health_issues: bool,
+) -> SuggestedQuestionsResult:
+    """Memoized body of suggest_questions (the returned result is shared; never mutate it)."""
+    role_map = _classify_roles(columns, total_rows)
+    roles = _split_roles(columns, role_map)
     time_cols = roles["time"]
     category_cols = roles["category"]
     numeric_cols = roles["numeric"]
     has_time = len(time_cols) > 0
-    has_health_issues = _has_health_issues(health_result)
-
-    total_rows = dataset_profile.dataset.rows
-
-    # Build lookup for missing counts per column to drive quality templates
-    missing_map: Dict[str, int] = {col.name: col.null_count for col in dataset_profile.columns}
 
     generated: List[SuggestedQuestion] = []
 
@@ -196,51 +212,27 @@ def suggest_questions(
         generated.extend(_numeric_templates(col, has_time=has_time))
 
     # Data-quality questions (per column, only if health issues exist or missing values)
-    if has_health_issues or any(missing_map.values()):
-        for col in dataset_profile.columns:
-            col_name = col.name
-            has_missing = missing_map.get(col_name, 0) > 0
-            generated.extend(_quality_templates(col_name, has_missing=has_missing))
-
-    # Validation filter: ensure referenced column exists in profile
-    existing_columns = {c.name for c in dataset_profile.columns}
-    valid_questions: List[SuggestedQuestion] = []
-    for q in generated:
-        if q.column not in existing_columns:
-            continue
-        # Role validation: ensure column matches the required type of the question
-        col_profile = next(c for c in dataset_profile.columns if c.name == q.column)
-        role = classify_column_role(
-            dtype=col_profile.dtype,
-            unique_count=col_profile.unique_count,
-            total_rows=total_rows,
-        )
-        if q.type == "time" and role != "timestamp":
-            continue
-        if q.type == "category" and role != "dimension":
-            continue
-        if q.type == "numeric" and role != "metric":
-            continue
-        if q.type == "quality":
-            # Quality questions are permissible for any column, provided it exists.
-            pass
-        valid_questions.append(q)
-
-    # Ranking
-    def sort_key(q: SuggestedQuestion):
-        return (
-            PRIORITY_ORDER.get(q.type, 99),
-            q.type,
-            q.column,
-            q.id,
-        )
-
-    sorted_questions = sorted(valid_questions, key=sort_key)
+    # (any() stops at the first column with missing values)
+    if has_health_issues or any(null_count for _, _, _, null_count in columns):
+        for name, _, _, null_count in columns:
+            generated.extend(_quality_templates(name, has_missing=null_count > 0))
+
+    # Validation filter: ensure referenced column exists in profile.
+    # Roles need no re-check: time/category/numeric questions were expanded
+    # from _split_roles' buckets, and quality questions are valid for any
+    # existing column.
+    existing_columns = {name for name, _, _, _ in columns}
+    valid_questions = [q for q in generated if q.column in existing_columns]
+
+    # Ranking (sort keys are built once per question, then sorted as plain tuples)
+    decorated = [
+        ((PRIORITY_ORDER.get(q.type, 99), q.type, q.column, q.id), q)
+        for q in valid_questions
+    ]
+    decorated.sort(key=itemgetter(0))
+    sorted_questions = [q for _, q in decorated]
 
     return SuggestedQuestionsResult(
-        dataset_id=dataset_profile.dataset.id,
+        dataset_id=dataset_id,
         questions=sorted_questions,
     )
-
-
-
@@ -5,8 +5,9 @@ Formats query results into human-readable natural language responses.
 CORE PRINCIPLE: Make responses sound human, precise, and context-aware.
 """
 
+import operator
 import re
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,30 @@ AGGREGATION_LANGUAGE = {
 }
 
 
+# Questions answerable from dataset metadata (one alternation, searched once)
+_METADATA_QUESTION_RE = re.compile(
+    r"how many columns|number of columns|what columns|which columns|list.*columns"
+    r"|column names|dataset shape|rows.*columns|dimensions"
+)
+
+
+# Comparative wording, matched against whole words of the question
+_COMPARATIVE_WORDS = frozenset({
+    "higher", "lower", "more", "less", "greater", "smaller",
+    "better", "worse", "larger", "bigger",
+    "compare", "compared", "compares", "comparing", "comparison", "comparisons",
+})
+_HIGHER_WORDS = frozenset({"higher", "more", "greater", "larger", "bigger", "maximum", "highest"})
+_LOWER_WORDS = frozenset({"lower", "less", "smaller", "minimum", "lowest"})
+
+_QUESTION_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _question_words(question: str) -> set:
+    """Lower-cased words of a question, tokenized once."""
+    return set(_QUESTION_WORD_RE.findall(question.lower()))
+
+
 def is_metadata_question(question: str) -> bool:
     """
     Check if a question can be answered from dataset metadata.
@@ -39,21 +64,7 @@ def is_metadata_question(question: str) -> bool:
     - Column names
     - Dataset shape (rows, columns)
     """
-    question_lower = question.lower()
-    
-    metadata_patterns = [
-        r"how many columns",
-        r"number of columns",
-        r"what columns",
-        r"which columns",
-        r"list.*columns",
-        r"column names",
-        r"dataset shape",
-        r"rows.*columns",
-        r"dimensions",
-    ]
-    
-    return any(re.search(pattern, question_lower) for pattern in metadata_patterns)
+    return _METADATA_QUESTION_RE.search(question.lower()) is not None
 
 
 def format_metadata_response(question: str, columns: List[Dict[str, Any]], total_rows: int) -> str:
@@ -112,6 +123,15 @@ def format_time_value(value: Any) -> str:
     if value is None:
         return "N/A"
     
+    # Numbers need no parsing (and ints no float round-trip)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        # Year-like values (1900-2100 once truncated) and whole numbers as integers
+        if 1900 <= value < 2101 or value.is_integer():
+            return str(int(value))
+        return f"{value:.2f}"
+    
     try:
         float_val = float(value)
         int_val = int(float_val)
@@ -130,39 +150,62 @@ def format_time_value(value: Any) -> str:
         return str(value)
 
 
+# Aggregation words as whole words; "_" counts as a separator so aliases like
+# "avg_price" and "count_star()" match while "COUNTRY" or "SUMMARY" don't
+_AGGREGATION_WORD_RE = re.compile(
+    r"(?<![A-Z0-9])(COUNT|SUM|TOTAL|AVG|AVERAGE|MEAN|MIN|MINIMUM|MAX|MAXIMUM)(?![A-Z0-9])"
+)
+
+# (word, aggregation) in precedence order: when several appear, the first listed wins
+_QUERY_AGGREGATIONS = (
+    ("COUNT", "count"),
+    ("SUM", "sum"),
+    ("AVG", "avg"),
+    ("AVERAGE", "avg"),
+    ("MIN", "min"),
+    ("MINIMUM", "min"),
+    ("MAX", "max"),
+    ("MAXIMUM", "max"),
+)
+_COLUMN_AGGREGATIONS = (
+    ("COUNT", "count"),
+    ("SUM", "sum"),
+    ("TOTAL", "sum"),
+    ("AVG", "avg"),
+    ("AVERAGE", "avg"),
+    ("MEAN", "avg"),
+    ("MIN", "min"),
+    ("MINIMUM", "min"),
+    ("MAX", "max"),
+    ("MAXIMUM", "max"),
+)
+
+
+def _find_aggregation(text: str, precedence: Tuple[Tuple[str, str], ...]) -> Optional[str]:
+    """Highest-precedence aggregation named in upper-cased text (one regex scan)."""
+    found = set(_AGGREGATION_WORD_RE.findall(text))
+    if found:
+        for word, aggregation in precedence:
+            if word in found:
+                return aggregation
+    return None
+
+
 def detect_aggregation_type(query: str, result_data: Dict[str, Any]) -> Optional[str]:
     """
     Detect the aggregation type from query or result structure.
     """
-    query_upper = query.upper()
-    
     # Check query for aggregation keywords
-    if "COUNT" in query_upper:
-        return "count"
-    elif "SUM" in query_upper:
-        return "sum"
-    elif "AVG" in query_upper or "AVERAGE" in query_upper:
-        return "avg"
-    elif "MIN" in query_upper:
-        return "min"
-    elif "MAX" in query_upper:
-        return "max"
+    aggregation = _find_aggregation(query.upper(), _QUERY_AGGREGATIONS)
+    if aggregation:
+        return aggregation
     
     # Check result structure
     result_type = result_data.get("type")
     if result_type == "scalar":
         # Try to infer from column name
         col_name = result_data.get("column_name", "").upper()
-        if "COUNT" in col_name:
-            return "count"
-        elif "SUM" in col_name or "TOTAL" in col_name:
-            return "sum"
-        elif "AVG" in col_name or "AVERAGE" in col_name or "MEAN" in col_name:
-            return "avg"
-        elif "MIN" in col_name:
-            return "min"
-        elif "MAX" in col_name:
-            return "max"
+        return _find_aggregation(col_name, _COLUMN_AGGREGATIONS)
     
     return None
 
@@ -206,12 +249,7 @@ def is_comparative_question(question: str) -> bool:
     """
     Check if a question uses comparative language.
     """
-    question_lower = question.lower()
-    comparative_keywords = [
-        "higher", "lower", "more", "less", "greater", "smaller",
-        "better", "worse", "larger", "bigger", "compare", "comparison"
-    ]
-    return any(keyword in question_lower for keyword in comparative_keywords)
+    return not _COMPARATIVE_WORDS.isdisjoint(_question_words(question))
 
 
 def format_comparative_result(
@@ -230,32 +268,37 @@ def format_comparative_result(
         if len(data) < 2:
             return None
         
-        # Extract groups and values
-        groups = []
-        values = []
-        for item in data:
-            # Support both "group" and "dimension" keys
-            group = item.get("group") or item.get("dimension", "")
-            value = item.get("value", 0)
-            groups.append(group)
-            values.append(value)
-        
         # Check if question asks for comparison
-        question_lower = question.lower()
+        question_words = _question_words(question)
         
         # Determine comparison direction
-        is_higher = any(word in question_lower for word in ["higher", "more", "greater", "larger", "bigger", "maximum", "highest"])
-        is_lower = any(word in question_lower for word in ["lower", "less", "smaller", "minimum", "lowest"])
+        is_higher = not _HIGHER_WORDS.isdisjoint(question_words)
+        is_lower = not _LOWER_WORDS.isdisjoint(question_words)
         
         if is_higher or is_lower:
-            # Find the group with highest/lowest value
+            # Extract groups and values (only once a direction is known);
+            # support both "group" and "dimension" keys
+            groups = [item.get("group") or item.get("dimension") or "" for item in data]
+            values = [item.get("value", 0) for item in data]
+            
+            # Find the group with highest/lowest value (first occurrence) and
+            # every group tied with it, in one pass
             if is_higher:
-                idx = values.index(max(values))
+                better = operator.gt
                 direction = "higher"
             else:
-                idx = values.index(min(values))
+                better = operator.lt
                 direction = "lower"
             
+            idx = 0
+            tie_indices = [0]
+            for i in range(1, len(values)):
+                if better(values[i], values[idx]):
+                    idx = i
+                    tie_indices = [i]
+                elif values[i] == values[idx]:
+                    tie_indices.append(i)
+            
             target_group = groups[idx]
             target_value = values[idx]
             
@@ -263,11 +306,9 @@ def format_comparative_result(
             formatted_value = format_time_value(target_value) if isinstance(target_value, (int, float)) else target_value
             
             # Check for ties
-            if values.count(values[idx]) > 1:
-                tied_groups = [groups[i] for i, v in enumerate(values) if v == values[idx]]
-                if len(tied_groups) > 1:
-                    groups_str = ", ".join(tied_groups)
-                    return f"Multiple groups are tied with the {direction} value ({formatted_value}): {groups_str}."
+            if len(tie_indices) > 1:
+                groups_str = ", ".join(groups[i] for i in tie_indices)
+                return f"Multiple groups are tied with the {direction} value ({formatted_value}): {groups_str}."
             
             # Compare with others if there are exactly 2 groups
             if len(groups) == 2:
@@ -287,6 +328,119 @@ def format_comparative_result(
     return None
 
 
+# === Per-Type Result Formatters ===
+# Each takes (result_data, query, question) and is looked up by result type
+# in _RESULT_FORMATTERS.
+
+def _format_empty(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    empty_msg = result_data.get("message", "No results found.")
+    if question:
+        # Try to explain why
+        question_lower = question.lower()
+        if "where" in question_lower or "with" in question_lower:
+            return f"No records match the specified criteria. {empty_msg}"
+    return empty_msg
+
+
+def _format_scalar(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    value = result_data.get("value")
+    column_name = result_data.get("column_name")
+    aggregation_type = detect_aggregation_type(query, result_data)
+    return format_scalar_result(value, aggregation_type, column_name, question)
+
+
+def _format_ranking(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    data = result_data.get("data", [])
+    if not data:
+        return "No ranking results found."
+    
+    # Format top result
+    top_item = data[0]
+    group = top_item.get("group", "item")
+    value = top_item.get("value", 0)
+    
+    formatted_value = format_time_value(value) if isinstance(value, (int, float)) else value
+    
+    # Check for ties
+    top_value = value
+    tied_items = [item for item in data if item.get("value") == top_value]
+    if len(tied_items) > 1:
+        tied_groups = [item.get("group") for item in tied_items]
+        groups_str = ", ".join(tied_groups[:3])
+        if len(tied_groups) > 3:
+            groups_str += f", and {len(tied_groups) - 3} more"
+        return f"Multiple items are tied for the top position ({formatted_value}): {groups_str}."
+    
+    return f"The top result is {group} with a value of {formatted_value}."
+
+
+def _format_breakdown(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    data = result_data.get("data", [])
+    if not data:
+        return "No breakdown results found."
+    
+    if len(data) == 1:
+        item = data[0]
+        # Support both "group" and "dimension" keys
+        group = item.get("group") or item.get("dimension", "item")
+        value = item.get("value", 0)
+        formatted_value = format_time_value(value) if isinstance(value, (int, float)) else value
+        return f"{group} has a value of {formatted_value}."
+    
+    # Multiple groups - summarize
+    top_item = max(data, key=lambda x: x.get("value", 0))
+    # Support both "group" and "dimension" keys
+    top_group = top_item.get("group") or top_item.get("dimension", "item")
+    top_value = top_item.get("value", 0)
+    formatted_top = format_time_value(top_value) if isinstance(top_value, (int, float)) else top_value
+    
+    return f"Results across {len(data)} groups. {top_group} has the highest value: {formatted_top}."
+
+
+def _format_time_series(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    data = result_data.get("data", [])
+    if not data:
+        return "No time series data found."
+    
+    # Format first and last points
+    first = data[0]
+    last = data[-1]
+    first_time = format_time_value(first.get("time", ""))
+    first_value = first.get("value", 0)
+    if isinstance(first_value, (int, float)):
+        first_value = format_time_value(first_value)
+    last_time = format_time_value(last.get("time", ""))
+    last_value = last.get("value", 0)
+    if isinstance(last_value, (int, float)):
+        last_value = format_time_value(last_value)
+    
+    return f"Time series shows values from {first_time} ({first_value}) to {last_time} ({last_value})."
+
+
+def _format_table(result_data: Dict[str, Any], query: str, question: Optional[str]) -> str:
+    data = result_data.get("data", [])
+    if not data:
+        return "No table results found."
+    
+    if len(data) == 1:
+        return f"Found 1 result: {data[0]}."
+    
+    return f"Found {len(data)} results."
+
+
+_RESULT_FORMATTERS: Dict[str, Callable[[Dict[str, Any], str, Optional[str]], str]] = {
+    "empty": _format_empty,
+    "scalar": _format_scalar,
+    "ranking": _format_ranking,
+    "breakdown": _format_breakdown,
+    "time_series": _format_time_series,
+    "table": _format_table,
+}
+
+# Result types format_comparative_result can phrase
+_COMPARATIVE_RESULT_TYPES = frozenset({"ranking", "breakdown"})
+
+
 def format_result(
     result_data: Dict[str, Any],
     query: str,
@@ -296,109 +450,25 @@ def format_result(
     """
     Format a query result into natural language.
     
-    This is the main entry point for result formatting.
+    This is the main entry point for result formatting: results carrying a
+    message are reported as empty, comparative questions about rankings and
+    breakdowns get a comparison, and everything else goes to the formatter
+    registered for its result type.
     """
     result_type = result_data.get("type")
     
-    # Handle empty results
-    if result_type == "empty" or result_data.get("message"):
-        empty_msg = result_data.get("message", "No results found.")
-        if question:
-            # Try to explain why
-            question_lower = question.lower()
-            if "where" in question_lower or "with" in question_lower:
-                return f"No records match the specified criteria. {empty_msg}"
-        return empty_msg
-    
-    # Handle scalar results
-    if result_type == "scalar":
-        value = result_data.get("value")
-        column_name = result_data.get("column_name")
-        aggregation_type = detect_aggregation_type(query, result_data)
-        return format_scalar_result(value, aggregation_type, column_name, question)
+    # Handle empty results (any result with a message counts)
+    if result_data.get("message"):
+        return _format_empty(result_data, query, question)
     
     # Handle comparative results
-    if question and is_comparative_question(question):
+    if result_type in _COMPARATIVE_RESULT_TYPES and question and is_comparative_question(question):
         comparative_result = format_comparative_result(result_data, question)
         if comparative_result:
             return comparative_result
     
-    # Handle ranking results
-    if result_type == "ranking":
-        data = result_data.get("data", [])
-        if not data:
-            return "No ranking results found."
-        
-        # Format top result
-        top_item = data[0]
-        group = top_item.get("group", "item")
-        value = top_item.get("value", 0)
-        
-        formatted_value = format_time_value(value) if isinstance(value, (int, float)) else value
-        
-        # Check for ties
-        top_value = value
-        tied_items = [item for item in data if item.get("value") == top_value]
-        if len(tied_items) > 1:
-            tied_groups = [item.get("group") for item in tied_items]
-            groups_str = ", ".join(tied_groups[:3])
-            if len(tied_groups) > 3:
-                groups_str += f", and {len(tied_groups) - 3} more"
-            return f"Multiple items are tied for the top position ({formatted_value}): {groups_str}."
-        
-        return f"The top result is {group} with a value of {formatted_value}."
-    
-    # Handle breakdown results
-    if result_type == "breakdown":
-        data = result_data.get("data", [])
-        if not data:
-            return "No breakdown results found."
-        
-        if len(data) == 1:
-            item = data[0]
-            # Support both "group" and "dimension" keys
-            group = item.get("group") or item.get("dimension", "item")
-            value = item.get("value", 0)
-            formatted_value = format_time_value(value) if isinstance(value, (int, float)) else value
-            return f"{group} has a value of {formatted_value}."
-        
-        # Multiple groups - summarize
-        total = sum(item.get("value", 0) for item in data)
-        top_item = max(data, key=lambda x: x.get("value", 0))
-        # Support both "group" and "dimension" keys
-        top_group = top_item.get("group") or top_item.get("dimension", "item")
-        top_value = top_item.get("value", 0)
-        formatted_top = format_time_value(top_value) if isinstance(top_value, (int, float)) else top_value
-        
-        return f"Results across {len(data)} groups. {top_group} has the highest value: {formatted_top}."
-    
-    # Handle time series
-    if result_type == "time_series":
-        data = result_data.get("data", [])
-        if not data:
-            return "No time series data found."
-        
-        # Format first and last points
-        first = data[0]
-        last = data[-1]
-        first_time = format_time_value(first.get("time", ""))
-        first_value = format_time_value(first.get("value", 0)) if isinstance(first.get("value"), (int, float)) else first.get("value", 0)
-        last_time = format_time_value(last.get("time", ""))
-        last_value = format_time_value(last.get("value", 0)) if isinstance(last.get("value"), (int, float)) else last.get("value", 0)
-        
-        return f"Time series shows values from {first_time} ({first_value}) to {last_time} ({last_value})."
-    
-    # Handle table results
-    if result_type == "table":
-        data = result_data.get("data", [])
-        if not data:
-            return "No table results found."
-        
-        if len(data) == 1:
-            return f"Found 1 result: {data[0]}."
-        
-        return f"Found {len(data)} results."
-    
-    # Fallback
-    return "Query executed successfully."
-
+    formatter = _RESULT_FORMATTERS.get(result_type)
+    if formatter is None:
+        # Fallback
+        return "Query executed successfully."
+    return formatter(result_data, query, question)
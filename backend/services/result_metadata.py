@@ -8,11 +8,39 @@ CORE PRINCIPLE: Extract column roles, cardinality, and sparsity from results
 without modifying the underlying data.
 """
 
-from typing import Dict, Any, List, Optional
+from functools import partial
+from operator import eq, is_not, itemgetter
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
 import re
 
 
+# Year-like ("2021") and date-like ("2021-05...") string samples
+_YEAR_RE = re.compile(r"^\d{4}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}")
+
+_is_not_none = partial(is_not, None)
+
+
+def _is_self_equal(value: Any) -> bool:
+    return value == value  # False only for NaN
+
+
+# Exact value types that can't be NaN / can't equal "" / need no per-value numeric check
+_ALWAYS_SELF_EQUAL = frozenset({int, str, bool})
+_NEVER_EMPTY_STRING = frozenset({int, float, bool})
+_PLAIN_NUMBERS = frozenset({int, float})
+
+# Name keywords, matched anywhere in the lower-cased column name
+# ("order_date", "orderdate" and "yearly" all count), one search each
+_TIME_NAME_RE = re.compile("|".join(
+    ["time", "date", "year", "month", "day", "week", "quarter", "period", "timestamp"]
+))
+_NUMERIC_NAME_RE = re.compile("|".join(
+    ["count", "sum", "avg", "average", "total", "amount", "value", "price", "quantity", "num", "number"]
+))
+
+
 class ResultMetadata:
     """Metadata extracted from query result."""
     
@@ -34,9 +62,9 @@ class ResultMetadata:
         }
 
 
-def infer_column_role(name: str, values: List[Any]) -> str:
+def infer_column_role(name: str, sample: Any) -> str:
     """
-    Infer column role from name and values.
+    Infer column role from name and a sample value (the column's first non-null value).
     
     Roles:
     - time: Date/time related columns
@@ -46,69 +74,109 @@ def infer_column_role(name: str, values: List[Any]) -> str:
     name_lower = name.lower()
     
     # Time indicators in column name
-    time_keywords = ["time", "date", "year", "month", "day", "week", "quarter", "period", "timestamp"]
-    if any(kw in name_lower for kw in time_keywords):
+    if _TIME_NAME_RE.search(name_lower):
         return "time"
     
-    # Check if values look like time
-    if values:
-        sample = values[0]
-        if isinstance(sample, (datetime,)):
+    # Check if the sample looks like time
+    if isinstance(sample, (datetime,)):
+        return "time"
+    if isinstance(sample, str):
+        # Check for year-like patterns (4 digits)
+        if _YEAR_RE.match(sample):
+            return "time"
+        # Check for date patterns
+        if _DATE_RE.match(sample):
             return "time"
-        if isinstance(sample, str):
-            # Check for year-like patterns (4 digits)
-            if re.match(r"^\d{4}$", str(sample)):
-                return "time"
-            # Check for date patterns
-            if re.match(r"^\d{4}-\d{2}", str(sample)):
-                return "time"
     
     # Numeric indicators
-    numeric_keywords = ["count", "sum", "avg", "average", "total", "amount", "value", "price", "quantity", "num", "number"]
-    if any(kw in name_lower for kw in numeric_keywords):
+    if _NUMERIC_NAME_RE.search(name_lower):
         return "numeric"
     
-    # Check if values are numeric
-    if values:
-        sample = values[0]
-        if isinstance(sample, (int, float)) and not isinstance(sample, bool):
-            return "numeric"
+    # Check if the sample is numeric
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return "numeric"
     
     # Default to categorical
     return "categorical"
 
 
-def calculate_cardinality(values: List[Any]) -> int:
-    """Calculate unique value count."""
+def _column_values(data: List[Dict[str, Any]], key: str) -> Tuple[Any, ...]:
+    """
+    One column's values, in row order (rows missing the key give None).
+    
+    Result rows normally all share the same keys, so the extraction runs in
+    C through itemgetter; ragged rows fall back to row.get.
+    """
     try:
-        return len(set(str(v) for v in values if v is not None))
-    except (TypeError, ValueError):
-        return len(values)
+        return tuple(map(itemgetter(key), data))
+    except KeyError:
+        return tuple(row.get(key) for row in data)
 
 
-def calculate_sparsity(values: List[Any]) -> float:
-    """Calculate null/missing percentage (0.0 to 1.0)."""
-    if not values:
-        return 0.0
-    null_count = sum(1 for v in values if v is None or v == "" or (isinstance(v, float) and v != v))  # NaN check
-    return null_count / len(values)
+def _distinct_count(present: List[Any], value_types: set, has_nan: bool) -> int:
+    """Number of distinct non-None values, as distinguished by their str() text."""
+    if len(value_types) == 1 and not has_nan:
+        # A single value type: equal values print the same, so the values can
+        # be hashed directly instead of allocating a string per row
+        try:
+            return len(set(present))
+        except TypeError:  # unhashable values (lists, dicts)
+            pass
+    # Mixed types (1 vs 1.0 vs True) or NaN (never equal to itself) need the text
+    return len(set(map(str, present)))
 
 
-def get_numeric_stats(values: List[Any]) -> Dict[str, Optional[float]]:
-    """Get min/max for numeric values."""
-    numeric_values = []
-    for v in values:
-        if isinstance(v, (int, float)) and not isinstance(v, bool):
-            if v == v:  # NaN check
-                numeric_values.append(v)
+def _column_meta(name: str, values: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Role, cardinality, sparsity (and numeric min/max) for one column's values."""
+    present = list(filter(_is_not_none, values))
+    value_types = set(map(type, present))
+    
+    # Nulls: None, "" and NaN (the only values not equal to themselves);
+    # the "" and NaN passes only run when the column's types can hold one
+    null_count = len(values) - len(present)
+    if not value_types <= _NEVER_EMPTY_STRING:
+        null_count += present.count("")
+    not_self_equal = 0
+    if not value_types <= _ALWAYS_SELF_EQUAL:
+        not_self_equal = len(present) - sum(map(eq, present, present))
+        null_count += not_self_equal
+    
+    # A leading NULL doesn't hide the column's type
+    role = infer_column_role(name, present[0] if present else None)
+    col_meta = {
+        "role": role,
+        "cardinality": _distinct_count(present, value_types, not_self_equal > 0),
+        "sparsity": null_count / len(values)
+    }
     
-    if not numeric_values:
-        return {"min": None, "max": None}
+    # Add numeric stats if applicable
+    if role == "numeric":
+        if value_types <= _PLAIN_NUMBERS:
+            # The usual all-int/float column: min/max run in C over the values
+            # themselves; NaNs (if any) are dropped with one C-level filter
+            numeric_values = list(filter(_is_self_equal, present)) if not_self_equal else present
+        else:
+            numeric_values = [
+                v for v in present
+                if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v  # NaN check
+            ]
+        col_meta["min"] = min(numeric_values) if numeric_values else None
+        col_meta["max"] = max(numeric_values) if numeric_values else None
+    
+    return col_meta
+
+
+def _scan_columns(data: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Metadata for every column of the result (columns come from the first row's keys).
     
-    return {
-        "min": min(numeric_values),
-        "max": max(numeric_values)
-    }
+    Columns are extracted and summarized one at a time, so only a single
+    column's values are held next to the rows (O(rows) extra memory rather
+    than O(rows x columns)). Each column's statistics are computed with
+    C-level builtins (filter, map, set, count) rather than per-value Python
+    code.
+    """
+    return {key: _column_meta(key, _column_values(data, key)) for key in data[0].keys()}
 
 
 def build_result_metadata(result_data: Dict[str, Any]) -> ResultMetadata:
@@ -128,62 +196,15 @@ def build_result_metadata(result_data: Dict[str, Any]) -> ResultMetadata:
     elif result_type == "empty":
         return ResultMetadata(columns={}, row_count=0, result_type=result_type)
     
-    elif result_type in ["time_series", "ranking", "breakdown"]:
-        data = result_data.get("data", [])
-        row_count = len(data)
-        
-        if not data:
-            return ResultMetadata(columns={}, row_count=0, result_type=result_type)
-        
-        # Extract column info from first row keys
-        sample_row = data[0]
-        
-        for key in sample_row.keys():
-            values = [row.get(key) for row in data]
-            role = infer_column_role(key, values)
-            cardinality = calculate_cardinality(values)
-            sparsity = calculate_sparsity(values)
-            
-            col_meta = {
-                "role": role,
-                "cardinality": cardinality,
-                "sparsity": sparsity
-            }
-            
-            # Add numeric stats if applicable
-            if role == "numeric":
-                stats = get_numeric_stats(values)
-                col_meta.update(stats)
-            
-            columns[key] = col_meta
-    
-    elif result_type == "table":
+    elif result_type in ["time_series", "ranking", "breakdown", "table"]:
         data = result_data.get("data", [])
         row_count = len(data)
         
         if not data:
             return ResultMetadata(columns={}, row_count=0, result_type=result_type)
         
-        # Get columns from first row
-        sample_row = data[0]
-        
-        for key in sample_row.keys():
-            values = [row.get(key) for row in data]
-            role = infer_column_role(key, values)
-            cardinality = calculate_cardinality(values)
-            sparsity = calculate_sparsity(values)
-            
-            col_meta = {
-                "role": role,
-                "cardinality": cardinality,
-                "sparsity": sparsity
-            }
-            
-            if role == "numeric":
-                stats = get_numeric_stats(values)
-                col_meta.update(stats)
-            
-            columns[key] = col_meta
+        # Column info from the first row's keys
+        columns = _scan_columns(data)
     
     return ResultMetadata(
         columns=columns,
@@ -12,12 +12,22 @@ LOGIC RULES:
 """
 
 import re
-from typing import Dict, List, Set, Optional, Tuple, Literal, Any
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Set, Optional, Tuple, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class QuestionType(IntEnum):
+    """Question classification (int-valued, so hot-path checks are int compares)."""
+    STRUCTURAL = 0
+    SEMANTIC = 1
+    SUBJECTIVE = 2
+
+
 # Structural concepts - can be answered without semantic mapping
 # These are detected from data structure, not business meaning
 STRUCTURAL_CONCEPTS = {
@@ -53,27 +63,13 @@ SUBJECTIVE_KEYWORDS = [
 ]
 
 
-def classify_question(question: str) -> Literal["structural", "semantic", "subjective"]:
-    """
-    Classify a question into structural, semantic, or subjective.
-    
-    Returns:
-        - "structural": Can be answered with COUNT, GROUP BY, MIN/MAX on any column
-        - "semantic": Requires business concept mapping
-        - "subjective": Requires human judgment, should be refused
-    """
-    question_lower = question.lower()
-    
-    # Check for subjective keywords first
-    for keyword in SUBJECTIVE_KEYWORDS:
-        pattern = r"\b" + re.escape(keyword) + r"\b"
-        if re.search(pattern, question_lower):
-            logger.info(f"Question classified as subjective: {keyword}")
-            return "subjective"
-    
-    # Check if question is purely structural
-    # Structural patterns: count, time trends, min/max on any column
-    structural_patterns = [
+# === Precompiled Patterns ===
+# Compiled once at import; classification runs on every question.
+
+# Structural patterns: count, time trends, min/max on any column
+_STRUCTURAL_RES: List[re.Pattern] = [
+    re.compile(pattern)
+    for pattern in [
         r"how many",
         r"number of",
         r"count",
@@ -93,79 +89,173 @@ def classify_question(question: str) -> Literal["structural", "semantic", "subje
         r"min value",
         r"max value",
     ]
+]
+
+# Words of a question: maximal runs of word characters, so a single-word
+# keyword is in the set exactly when r"\bkeyword\b" would match
+_WORD_RE = re.compile(r"\w+")
+
+# Single-word subjective keywords are plain set lookups against the question's
+# words; only the few phrases need a regex, and only when one of their words
+# appears in the question
+_SUBJECTIVE_WORDS = frozenset(kw for kw in SUBJECTIVE_KEYWORDS if " " not in kw)
+_SUBJECTIVE_PHRASES: List[str] = [kw for kw in SUBJECTIVE_KEYWORDS if " " in kw]
+_SUBJECTIVE_PHRASE_WORDS = frozenset(
+    word for phrase in _SUBJECTIVE_PHRASES for word in phrase.split()
+)
+_SUBJECTIVE_PHRASE_RE = re.compile(
+    "|".join(r"\b" + re.escape(kw) + r"\b" for kw in _SUBJECTIVE_PHRASES)
+)
+
+# "min value", "average values", ... - a structural use of "value"
+_AGGREGATED_VALUE_RE = re.compile(
+    r"\b(min|max|minimum|maximum|average|mean|sum|total|avg)\s+(value|values)"
+)
+
+
+# === Keyword Scanning ===
+# All semantic keywords in one alternation (longest first), so a question is
+# scanned once instead of once per keyword; each hit maps back to its concept.
+# Keywords are unique across concepts, so the reverse index is exact.
+
+_KEYWORD_CONCEPTS: Dict[str, str] = {
+    keyword: concept
+    for concept, keywords in SEMANTIC_CONCEPTS.items()
+    for keyword in keywords
+}
+_SEMANTIC_KEYWORDS: List[str] = sorted(_KEYWORD_CONCEPTS, key=len, reverse=True)
+
+# Each concept's keywords, longest first (compound phrases before their parts)
+_CONCEPT_KEYWORDS_BY_LENGTH: Dict[str, List[str]] = {
+    concept: sorted(keywords, key=len, reverse=True)
+    for concept, keywords in SEMANTIC_CONCEPTS.items()
+}
+
+# Any semantic keyword as a whole word/phrase (classification only needs a yes/no)
+_SEMANTIC_WORD_RE = re.compile(
+    "|".join(r"\b" + re.escape(kw) + r"\b" for kw in _SEMANTIC_KEYWORDS)
+)
+
+# Concept detection: multi-word phrases match as-is, single words need word
+# boundaries (questions are lower-cased before scanning)
+_SEMANTIC_CONCEPT_RE = re.compile(
+    "|".join(
+        re.escape(kw) if " " in kw else r"\b" + re.escape(kw) + r"\b"
+        for kw in _SEMANTIC_KEYWORDS
+    )
+)
+
+
+@lru_cache(maxsize=4096)
+def classify_question(question: str) -> QuestionType:
+    """
+    Classify a question into structural, semantic, or subjective.
+    
+    Returns:
+        - STRUCTURAL: Can be answered with COUNT, GROUP BY, MIN/MAX on any column
+        - SEMANTIC: Requires business concept mapping
+        - SUBJECTIVE: Requires human judgment, should be refused
+    """
+    question_lower = question.lower()
+    
+    # Check for subjective keywords first (most questions have none, so the
+    # common path is a few set lookups)
+    tokens = set(_WORD_RE.findall(question_lower))
+    subjective_words = tokens & _SUBJECTIVE_WORDS
+    if subjective_words:
+        logger.info(f"Question classified as subjective: {', '.join(sorted(subjective_words))}")
+        return QuestionType.SUBJECTIVE
+    if not tokens.isdisjoint(_SUBJECTIVE_PHRASE_WORDS):
+        subjective_match = _SUBJECTIVE_PHRASE_RE.search(question_lower)
+        if subjective_match:
+            logger.info(f"Question classified as subjective: {subjective_match.group()}")
+            return QuestionType.SUBJECTIVE
     
-    is_structural = any(re.search(pattern, question_lower) for pattern in structural_patterns)
+    # Check if question is purely structural
+    # Structural patterns: count, time trends, min/max on any column
+    is_structural = any(pattern.search(question_lower) for pattern in _STRUCTURAL_RES)
     
     # If it's about records/rows/dataset structure, it's structural
     if any(word in question_lower for word in ["record", "row", "dataset", "data"]):
         is_structural = True
     
     # If it asks about "value" in a structural context (min/max/average), it's structural
-    if re.search(r"\b(min|max|minimum|maximum|average|mean|sum|total|avg)\s+(value|values)", question_lower):
+    if _AGGREGATED_VALUE_RE.search(question_lower):
         is_structural = True
     
     # If question mentions semantic concepts, it might be semantic
-    semantic_detected = False
-    for concept, keywords in SEMANTIC_CONCEPTS.items():
-        for keyword in keywords:
-            pattern = r"\b" + re.escape(keyword) + r"\b"
-            if re.search(pattern, question_lower):
-                semantic_detected = True
-                break
-        if semantic_detected:
-            break
+    semantic_detected = _SEMANTIC_WORD_RE.search(question_lower) is not None
     
     # If structural patterns exist and no semantic concepts, it's structural
     if is_structural and not semantic_detected:
         logger.info("Question classified as structural")
-        return "structural"
+        return QuestionType.STRUCTURAL
     
     # If semantic concepts detected, it's semantic
     if semantic_detected:
         logger.info("Question classified as semantic")
-        return "semantic"
+        return QuestionType.SEMANTIC
     
     # Default to structural (can be answered with basic operations)
     logger.info("Question classified as structural (default)")
-    return "structural"
+    return QuestionType.STRUCTURAL
 
 
-def detect_semantic_concepts(question: str) -> Set[str]:
+@lru_cache(maxsize=4096)
+def detect_semantic_concepts(question: str) -> FrozenSet[str]:
     """
     Detect ONLY semantic concepts (not structural ones).
     
-    Returns a set of semantic concept names (e.g., {"rating", "country"}).
+    Returns a set of semantic concept names (e.g., {"rating", "country"}),
+    frozen because results are cached and shared between calls.
     Structural concepts like "year", "quantity", "duration" are excluded.
     
     Handles compound phrases like "gross revenue" by matching longer phrases first.
     """
     question_lower = question.lower()
-    detected = set()
     
-    # Only check semantic concepts, not structural ones
-    for concept, keywords in SEMANTIC_CONCEPTS.items():
-        # Sort keywords by length (descending) to match longer phrases first
-        # e.g., "gross revenue" should match before just "revenue"
-        sorted_keywords = sorted(keywords, key=len, reverse=True)
-        
-        for keyword in sorted_keywords:
-            # For multi-word keywords, match as phrase (case-insensitive)
-            # For single words, use word boundaries
-            if " " in keyword:
-                # Multi-word phrase: match as phrase
-                pattern = re.escape(keyword)
-            else:
-                # Single word: use word boundaries
-                pattern = r"\b" + re.escape(keyword) + r"\b"
-            
-            if re.search(pattern, question_lower, re.IGNORECASE):
-                detected.add(concept)
-                break  # Found one keyword for this concept, move to next concept
+    # Only semantic concepts are scanned, not structural ones. One pass over
+    # the question; longer phrases are tried first at each position, e.g.
+    # "gross revenue" matches before just "revenue".
+    detected = frozenset(
+        _KEYWORD_CONCEPTS[match.group()]
+        for match in _SEMANTIC_CONCEPT_RE.finditer(question_lower)
+    )
     
     logger.info(f"Detected semantic concepts in question: {detected}")
     return detected
 
 
+_AGG = r"(avg|average|sum|total|mean|min|max|median)"
+
+# Aggregation context anywhere in the question, as a substring ("totals",
+# "maximum" count too), in one scan
+_AGGREGATION_CONTEXT_RE = re.compile("average|avg|sum|total|mean|min|max")
+
+
+@lru_cache(maxsize=None)  # one entry per semantic keyword
+def _requirement_patterns(keyword: str) -> Dict[str, re.Pattern]:
+    """Compiled is_concept_required patterns for one keyword, built on first use."""
+    kw = re.escape(keyword)
+    # For multi-word keywords, match as phrase; for single words, use word boundaries
+    mention = kw if " " in keyword else rf"\b{kw}\b"
+    return {
+        "mention": re.compile(mention, re.IGNORECASE),
+        "which": re.compile(rf"\bwhich\s+{kw}", re.IGNORECASE),
+        "by": re.compile(rf"\bby\s+{kw}", re.IGNORECASE),
+        "target": re.compile(rf"{kw}\s+(of|for|in)", re.IGNORECASE),
+        "filter": re.compile(rf"\b(where|with|having)\s+{kw}", re.IGNORECASE),
+        "condition": re.compile(rf"{kw}\s+(is|has|equals|contains)", re.IGNORECASE),
+        "aggregated": re.compile(rf"\b{_AGG}\s+(of\s+)?.*?{kw}", re.IGNORECASE),
+        "aggregated_direct": re.compile(rf"\b{_AGG}\s+{kw}", re.IGNORECASE),
+        "aggregated_of": re.compile(rf"\b{_AGG}\s+of\s+.*?{kw}\b", re.IGNORECASE),
+        "what_aggregated": re.compile(rf"\bwhat\s+is\s+the\s+{_AGG}\s+{kw}", re.IGNORECASE),
+        "what_aggregated_of": re.compile(rf"\bwhat\s+is\s+the\s+{_AGG}\s+of\s+.*?{kw}\b", re.IGNORECASE),
+        "what_aggregated_plain": re.compile(rf"\bwhat\s+is\s+the\s+(avg|average|sum|total|mean|min|max)\s+{kw}"),
+        "the": re.compile(rf"\bthe\s+{kw}\b"),
+    }
+
+
 def is_concept_required(question: str, concept: str) -> bool:
     """
     Check if a concept is REQUIRED to answer the question.
@@ -181,58 +271,51 @@ def is_concept_required(question: str, concept: str) -> bool:
     """
     question_lower = question.lower()
     
-    concept_keywords = SEMANTIC_CONCEPTS.get(concept, [])
-    # Sort by length (longest first) to match compound phrases first
-    sorted_keywords = sorted(concept_keywords, key=len, reverse=True)
-    
-    for keyword in sorted_keywords:
-        # For multi-word keywords, match as phrase; for single words, use word boundaries
-        if " " in keyword:
-            keyword_pattern = re.escape(keyword)
-        else:
-            keyword_pattern = r"\b" + re.escape(keyword) + r"\b"
+    # Longest first, to match compound phrases first
+    for keyword in _CONCEPT_KEYWORDS_BY_LENGTH.get(concept, []):
+        patterns = _requirement_patterns(keyword)
         
-        if re.search(keyword_pattern, question_lower, re.IGNORECASE):
+        if patterns["mention"].search(question_lower):
             # Pattern: "which [keyword]" - grouping/ranking
-            if re.search(rf"\bwhich\s+{re.escape(keyword)}", question_lower, re.IGNORECASE):
+            if patterns["which"].search(question_lower):
                 return True
             # Pattern: "by [keyword]" - grouping
-            if re.search(rf"\bby\s+{re.escape(keyword)}", question_lower, re.IGNORECASE):
+            if patterns["by"].search(question_lower):
                 return True
             # Pattern: "[keyword] of" or "[keyword] for" - aggregation target
-            if re.search(rf"{re.escape(keyword)}\s+(of|for|in)", question_lower, re.IGNORECASE):
+            if patterns["target"].search(question_lower):
                 return True
             # Pattern: "where [keyword]" or "with [keyword]" - filtering
-            if re.search(rf"\b(where|with|having)\s+{re.escape(keyword)}", question_lower, re.IGNORECASE):
+            if patterns["filter"].search(question_lower):
                 return True
             # Pattern: "[keyword] is" or "[keyword] has" - filtering/condition
-            if re.search(rf"{re.escape(keyword)}\s+(is|has|equals|contains)", question_lower, re.IGNORECASE):
+            if patterns["condition"].search(question_lower):
                 return True
             # Pattern: "average [keyword]", "sum of [keyword]", "total [keyword]", etc. - aggregation
             # This handles "average gross revenue" by matching "average" followed by any phrase containing the keyword
             # BUT: exclude cases where keyword appears after "of" with another concept (e.g., "revenue of movies" - movies is descriptive)
-            if re.search(rf"\b(avg|average|sum|total|mean|min|max|median)\s+(of\s+)?.*?{re.escape(keyword)}", question_lower, re.IGNORECASE):
+            if patterns["aggregated"].search(question_lower):
                 # Check if this is a descriptive phrase (e.g., "revenue of movies" where "movies" is just context)
                 # If keyword appears after "of" and before another semantic concept, it might be descriptive
                 # For now, if keyword appears directly after aggregation word, it's required
-                if re.search(rf"\b(avg|average|sum|total|mean|min|max|median)\s+{re.escape(keyword)}", question_lower, re.IGNORECASE):
+                if patterns["aggregated_direct"].search(question_lower):
                     return True
                 # If keyword appears after "of" but is the main aggregation target, it's required
-                if re.search(rf"\b(avg|average|sum|total|mean|min|max|median)\s+of\s+.*?{re.escape(keyword)}\b", question_lower, re.IGNORECASE):
+                if patterns["aggregated_of"].search(question_lower):
                     return True
             # Pattern: "what is the [aggregation] [keyword]" - common question format
-            if re.search(rf"\bwhat\s+is\s+the\s+(avg|average|sum|total|mean|min|max|median)\s+{re.escape(keyword)}", question_lower, re.IGNORECASE):
+            if patterns["what_aggregated"].search(question_lower):
                 return True
             # Pattern: "what is the [aggregation] of [keyword]" - handles "average of revenue"
-            if re.search(rf"\bwhat\s+is\s+the\s+(avg|average|sum|total|mean|min|max|median)\s+of\s+.*?{re.escape(keyword)}\b", question_lower, re.IGNORECASE):
+            if patterns["what_aggregated_of"].search(question_lower):
                 return True
             # Pattern: "what is the [aggregation] [keyword]" - aggregation
-            if re.search(rf"\bwhat\s+is\s+the\s+(avg|average|sum|total|mean|min|max)\s+{re.escape(keyword)}", question_lower):
+            if patterns["what_aggregated_plain"].search(question_lower):
                 return True
             # Pattern: "the [keyword]" when followed by aggregation context
-            if re.search(rf"\bthe\s+{re.escape(keyword)}\b", question_lower):
+            if patterns["the"].search(question_lower):
                 # Check if it's in an aggregation context
-                if any(agg in question_lower for agg in ["average", "avg", "sum", "total", "mean", "min", "max"]):
+                if _AGGREGATION_CONTEXT_RE.search(question_lower):
                     return True
     
     return False
@@ -265,7 +348,7 @@ def get_mapping_clarification_message(missing_concepts: Set[str]) -> str:
     Generate a user-friendly message asking for column mappings.
     """
     if len(missing_concepts) == 1:
-        concept = list(missing_concepts)[0]
+        concept = next(iter(missing_concepts))
         return f"To answer this question, I need to know which column represents '{concept}'. Please select the column from your dataset."
     else:
         concepts_list = ", ".join([f"'{c}'" for c in sorted(missing_concepts)])
@@ -274,6 +357,9 @@ def get_mapping_clarification_message(missing_concepts: Set[str]) -> str:
 
 class SemanticResolutionResult:
     """Result of semantic resolution."""
+    # Built on every chat turn: slots skip the per-instance __dict__
+    __slots__ = ("needs_clarification", "missing_concepts", "message", "mapped_concepts")
+    
     def __init__(
         self,
         needs_clarification: bool,
@@ -287,24 +373,40 @@ class SemanticResolutionResult:
         self.mapped_concepts = mapped_concepts or {}
 
 
+@dataclass
+class QuestionAnalysis:
+    """Question-only analysis, computed once per resolve_semantics call."""
+    question_type: QuestionType
+    intent_components: Any  # IntentComponents
+    semantic_concepts: FrozenSet[str]  # Only detected for semantic questions
+
+
 def resolve_semantic_dependencies(
     question: str,
     existing_mappings: Dict[str, str],
-    intent_components: Optional[Any] = None
+    intent_components: Optional[Any] = None,
+    analysis: Optional[QuestionAnalysis] = None
 ) -> Tuple[List[str], Set[str]]:
     """
     Resolve semantic dependencies in order.
     
+    An existing analysis supplies the intent and detected concepts, so the
+    question isn't decomposed or scanned again.
+    
     Returns:
         (ordered_dependencies, missing_dependencies)
     """
     from services.intent_decomposition import decompose_intent
     
-    if intent_components is None:
-        intent_components = decompose_intent(question)
-    
-    # Collect all semantic concepts mentioned
-    detected_concepts = detect_semantic_concepts(question)
+    if analysis is not None:
+        intent_components = analysis.intent_components
+        detected_concepts = analysis.semantic_concepts
+    else:
+        if intent_components is None:
+            intent_components = decompose_intent(question)
+        
+        # Collect all semantic concepts mentioned
+        detected_concepts = detect_semantic_concepts(question)
     
     # Order dependencies based on question structure
     # If ordering is required, ordering target comes first
@@ -313,15 +415,8 @@ def resolve_semantic_dependencies(
     
     # Check ordering target first if present
     if intent_components.requires_ordering and intent_components.ordering_target:
-        ordering_concept = None
         # Check if ordering_target matches a semantic concept
-        for concept, keywords in SEMANTIC_CONCEPTS.items():
-            for keyword in keywords:
-                if keyword == intent_components.ordering_target:
-                    ordering_concept = concept
-                    break
-            if ordering_concept:
-                break
+        ordering_concept = _KEYWORD_CONCEPTS.get(intent_components.ordering_target)
         
         if ordering_concept and ordering_concept in detected_concepts:
             if ordering_concept not in existing_mappings:
@@ -369,27 +464,27 @@ def resolve_semantics(
     question_type = classify_question(question)
     
     # Step 2: Handle subjective questions
-    if question_type == "subjective":
+    if question_type == QuestionType.SUBJECTIVE:
         return SemanticResolutionResult(
             needs_clarification=True,
             missing_concepts=set(),
             message="I cannot answer questions that require subjective judgment or policy decisions. Please ask about specific, measurable data instead."
         )
     
-    # Step 3: Decompose intent
-    intent_components = decompose_intent(question)
+    # Step 3: Decompose intent (concepts are only needed for semantic questions)
+    analysis = QuestionAnalysis(
+        question_type=question_type,
+        intent_components=decompose_intent(question),
+        semantic_concepts=(
+            detect_semantic_concepts(question) if question_type == QuestionType.SEMANTIC else frozenset()
+        ),
+    )
+    intent_components = analysis.intent_components
     
     # Step 4: Check ordering validity if ordering is required
     if intent_components.requires_ordering and intent_components.ordering_target:
         # Check if ordering target is a semantic concept
-        ordering_concept = None
-        for concept, keywords in SEMANTIC_CONCEPTS.items():
-            for keyword in keywords:
-                if keyword == intent_components.ordering_target:
-                    ordering_concept = concept
-                    break
-            if ordering_concept:
-                break
+        ordering_concept = _KEYWORD_CONCEPTS.get(intent_components.ordering_target)
         
         if ordering_concept:
             # Check if we have column info to validate
@@ -410,7 +505,7 @@ def resolve_semantics(
                         )
     
     # Step 5: Handle structural questions
-    if question_type == "structural":
+    if question_type == QuestionType.STRUCTURAL:
         # Structural questions never need semantic mappings
         logger.info("Structural question - no semantic mapping required")
         return SemanticResolutionResult(
@@ -422,13 +517,13 @@ def resolve_semantics(
     ordered_dependencies, missing_dependencies = resolve_semantic_dependencies(
         question,
         existing_mappings,
-        intent_components
+        analysis=analysis
     )
     
     if missing_dependencies:
         # Need clarification for missing dependencies
         # Ask for the FIRST missing dependency (ordered)
-        first_missing = sorted(missing_dependencies)[0] if missing_dependencies else None
+        first_missing = min(missing_dependencies) if missing_dependencies else None
         if first_missing:
             message = f"To answer this question, I need to know which column represents '{first_missing}'. Please select the column from your dataset."
             return SemanticResolutionResult(
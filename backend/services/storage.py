@@ -5,12 +5,17 @@ For Phase 1, we use local temp storage.
 Cloudflare R2 integration will be added when deploying.
 """
 
+import logging
 import os
 import shutil
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
-import json
+from typing import IO, BinaryIO, Optional, Set, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
 
 
 # Local temp directory for development
@@ -20,6 +25,13 @@ TEMP_DIR.mkdir(exist_ok=True)
 # Session TTL in hours
 SESSION_TTL_HOURS = 24
 
+# Stored JSON stays human-readable; numpy scalars and non-str keys are
+# encoded natively, anything else unsupported falls back to str()
+JSON_DUMP_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Chunk size for streamed saves
+STREAM_BUFFER_SIZE = 1 << 20
+
 
 class TempStorage:
     """Temporary storage manager for datasets."""
@@ -27,11 +39,32 @@ class TempStorage:
     def __init__(self, base_dir: Path = TEMP_DIR):
         self.base_dir = base_dir
         self.base_dir.mkdir(exist_ok=True)
+        # Sessions known to exist on disk, so saves skip the exists() stat
+        self._known_sessions: Set[str] = set()
     
     def _get_session_dir(self, session_id: str) -> Path:
         """Get the directory for a session."""
         return self.base_dir / session_id
     
+    def _ensure_session(self, session_id: str) -> Path:
+        """Session directory, created on first use (checked once per session)."""
+        session_dir = self._get_session_dir(session_id)
+        if session_id not in self._known_sessions:
+            if not session_dir.exists():
+                self.create_session(session_id)
+            self._known_sessions.add(session_id)
+        return session_dir
+    
+    def _open_for_write(self, session_id: str, filename: str, mode: str) -> IO:
+        """Open a session file for writing, creating the session if needed."""
+        try:
+            return open(self._ensure_session(session_id) / filename, mode)
+        except FileNotFoundError:
+            # The session was removed since we last saw it (e.g. another
+            # worker's cleanup sweep): recreate it once
+            self._known_sessions.discard(session_id)
+            return open(self._ensure_session(session_id) / filename, mode)
+    
     def create_session(self, session_id: str) -> Path:
         """Create a new session directory."""
         session_dir = self._get_session_dir(session_id)
@@ -42,81 +75,113 @@ class TempStorage:
             "created_at": datetime.utcnow().isoformat(),
             "expires_at": (datetime.utcnow() + timedelta(hours=SESSION_TTL_HOURS)).isoformat(),
         }
-        with open(session_dir / "metadata.json", "w") as f:
-            json.dump(metadata, f)
+        with open(session_dir / "metadata.json", "wb") as f:
+            f.write(orjson.dumps(metadata))
         
+        self._known_sessions.add(session_id)
         return session_dir
     
     def save_file(self, session_id: str, filename: str, content: bytes) -> Path:
         """Save a file to the session directory."""
-        session_dir = self._get_session_dir(session_id)
-        if not session_dir.exists():
-            self.create_session(session_id)
-        
-        file_path = session_dir / filename
-        with open(file_path, "wb") as f:
+        with self._open_for_write(session_id, filename, "wb") as f:
             f.write(content)
         
-        return file_path
+        return self._get_session_dir(session_id) / filename
+    
+    def save_stream(
+        self,
+        session_id: str,
+        filename: str,
+        stream: BinaryIO,
+        buf_size: int = STREAM_BUFFER_SIZE,
+    ) -> Path:
+        """
+        Save a file-like object to the session directory.
+        
+        Copies from the stream's current position in buf_size chunks, so peak
+        memory stays at one buffer rather than the whole file.
+        """
+        with self._open_for_write(session_id, filename, "wb") as f:
+            shutil.copyfileobj(stream, f, buf_size)
+        
+        return self._get_session_dir(session_id) / filename
     
     def get_file(self, session_id: str, filename: str) -> Optional[bytes]:
         """Retrieve a file from the session directory."""
         file_path = self._get_session_dir(session_id) / filename
-        if file_path.exists():
+        try:
             with open(file_path, "rb") as f:
                 return f.read()
-        return None
+        except FileNotFoundError:
+            return None
+    
+    def get_file_version(self, session_id: str, filename: str) -> Optional[Tuple[int, int]]:
+        """Cheap version key for a stored file: (mtime_ns, size), or None if missing."""
+        file_path = self._get_session_dir(session_id) / filename
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
     
     def save_json(self, session_id: str, name: str, data: dict) -> Path:
         """Save JSON data to the session directory."""
-        session_dir = self._get_session_dir(session_id)
-        if not session_dir.exists():
-            self.create_session(session_id)
-        
-        file_path = session_dir / f"{name}.json"
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2, default=str)
+        filename = f"{name}.json"
+        data_bytes = orjson.dumps(data, option=JSON_DUMP_OPTIONS, default=str)
+        with self._open_for_write(session_id, filename, "wb") as f:
+            f.write(data_bytes)
         
-        return file_path
+        return self._get_session_dir(session_id) / filename
     
     def get_json(self, session_id: str, name: str) -> Optional[dict]:
         """Retrieve JSON data from the session directory."""
         file_path = self._get_session_dir(session_id) / f"{name}.json"
-        if file_path.exists():
-            with open(file_path, "r") as f:
-                return json.load(f)
-        return None
+        try:
+            with open(file_path, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
     
     def delete_session(self, session_id: str) -> bool:
         """Delete a session and all its data."""
+        self._known_sessions.discard(session_id)
         session_dir = self._get_session_dir(session_id)
         if session_dir.exists():
-            shutil.rmtree(session_dir)
+            shutil.rmtree(session_dir, ignore_errors=True)
             return True
         return False
     
     def cleanup_expired(self) -> int:
-        """Remove expired sessions. Returns count of removed sessions."""
+        """
+        Remove expired sessions. Returns count of removed sessions.
+        
+        A session expires SESSION_TTL_HOURS after its metadata.json was
+        written (create_session writes it once), so the file's mtime is
+        enough; its content isn't read.
+        """
         removed = 0
-        now = datetime.utcnow()
+        cutoff = time.time() - SESSION_TTL_HOURS * 3600
         
-        for session_dir in self.base_dir.iterdir():
-            if not session_dir.is_dir():
-                continue
-            
-            metadata_path = session_dir / "metadata.json"
-            if metadata_path.exists():
+        with os.scandir(self.base_dir) as entries:
+            for entry in entries:
+                # One bad or concurrently removed session (e.g. another worker
+                # sweeping too) must not abort the sweep or app startup
                 try:
-                    with open(metadata_path) as f:
-                        metadata = json.load(f)
-                    expires_at = datetime.fromisoformat(metadata["expires_at"])
-                    if now > expires_at:
-                        shutil.rmtree(session_dir)
+                    if not entry.is_dir():
+                        continue
+                    
+                    try:
+                        created_at = os.stat(os.path.join(entry.path, "metadata.json")).st_mtime
+                    except FileNotFoundError:
+                        continue
+                    if created_at < cutoff:
+                        self._known_sessions.discard(entry.name)
+                        shutil.rmtree(entry.path)
                         removed += 1
-                except Exception:
-                    # If metadata is corrupt, remove the session
-                    shutil.rmtree(session_dir)
-                    removed += 1
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning("Could not clean up session %s: %s", entry.name, e)
         
         return removed
 
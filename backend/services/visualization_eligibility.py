@@ -7,7 +7,7 @@ Returns eligibility status and inferred visualization shape.
 CORE PRINCIPLE: Strict, deterministic rules - no AI/LLM involvement.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from services.result_metadata import ResultMetadata
 
 
@@ -23,6 +23,9 @@ MIN_CARDINALITY_FOR_CHART = 2
 class EligibilityResult:
     """Result of eligibility check."""
     
+    # Built on every chat turn: slots skip the per-instance __dict__
+    __slots__ = ("eligible", "reason", "shape")
+    
     def __init__(
         self,
         eligible: bool,
@@ -100,8 +103,15 @@ def check_eligibility(
             reason="No analyzable columns in result"
         )
     
+    # Bucket column names by role in a single pass
+    columns_by_role: Dict[str, List[str]] = {"numeric": [], "time": [], "categorical": []}
+    for name, info in columns.items():
+        role_columns = columns_by_role.get(info.get("role"))
+        if role_columns is not None:
+            role_columns.append(name)
+    
     # Must have at least one numeric column for visualization
-    numeric_cols = [name for name, info in columns.items() if info.get("role") == "numeric"]
+    numeric_cols = columns_by_role["numeric"]
     
     if not numeric_cols:
         return EligibilityResult(
@@ -112,7 +122,7 @@ def check_eligibility(
     # Determine shape based on result type
     if result_type == "time_series":
         # Check for time column
-        time_cols = [name for name, info in columns.items() if info.get("role") == "time"]
+        time_cols = columns_by_role["time"]
         
         if not time_cols:
             # Fallback: treat as breakdown if no time column detected
@@ -154,10 +164,9 @@ def check_eligibility(
         # Tables are generally not visualized, but could be if structured right
         # Check if it looks like a 2-column aggregation
         if len(columns) == 2:
-            cat_cols = [n for n, i in columns.items() if i.get("role") in ["categorical", "time"]]
-            num_cols = [n for n, i in columns.items() if i.get("role") == "numeric"]
+            cat_cols = columns_by_role["categorical"] + columns_by_role["time"]
             
-            if cat_cols and num_cols and row_count <= MAX_BREAKDOWN_ITEMS:
+            if cat_cols and numeric_cols and row_count <= MAX_BREAKDOWN_ITEMS:
                 return EligibilityResult(
                     eligible=True,
                     shape="breakdown"
@@ -4,28 +4,48 @@ Quick test script for chat execution.
 
 Usage:
     python test_chat.py <dataset_id> "Your question here"
+    python test_chat.py <dataset_id> --file questions.txt
+
+A single question is sent with a plain synchronous client. With --file, each
+non-empty line (except # comments) is a question; all of them are sent
+concurrently and the results are printed in file order.
 """
 
+import asyncio
 import sys
-import requests
+import httpx
 import json
 
 BASE_URL = "http://localhost:8000"
 
-def test_question(dataset_id: str, question: str):
-    """Test a question on a dataset."""
-    url = f"{BASE_URL}/api/chat/{dataset_id}/execute"
-    
+
+def test_question(client: httpx.Client, dataset_id: str, question: str) -> httpx.Response:
+    """Send a question for a dataset."""
+    return client.post(
+        f"/api/chat/{dataset_id}/execute",
+        json={"question": question},
+        timeout=10
+    )
+
+
+async def test_question_async(client: httpx.AsyncClient, dataset_id: str, question: str) -> httpx.Response:
+    """Send a question for a dataset (the client's connections are shared across calls)."""
+    return await client.post(
+        f"/api/chat/{dataset_id}/execute",
+        json={"question": question},
+        timeout=10
+    )
+
+
+def print_result(question: str, response) -> None:
+    """Print one question's outcome: an httpx.Response or the exception it raised."""
     print(f"\n{'='*60}")
     print(f"Question: {question}")
     print(f"{'='*60}\n")
     
     try:
-        response = requests.post(
-            url,
-            json={"question": question},
-            timeout=10
-        )
+        if isinstance(response, BaseException):
+            raise response
         
         if response.status_code == 200:
             result = response.json()
@@ -81,22 +101,55 @@ def test_question(dataset_id: str, question: str):
             print(f"❌ Error: {response.status_code}")
             print(response.text)
             
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("❌ Error: Could not connect to backend")
         print("   Make sure backend is running on http://localhost:8000")
     except Exception as e:
         print(f"❌ Error: {e}")
 
+
+def run_question(dataset_id: str, question: str) -> None:
+    """Run a single question synchronously and print the result."""
+    with httpx.Client(base_url=BASE_URL) as client:
+        try:
+            response = test_question(client, dataset_id, question)
+        except Exception as e:
+            response = e
+    
+    print_result(question, response)
+
+
+async def run_questions(dataset_id: str, questions: list) -> None:
+    """Run all questions concurrently, then print the results in order."""
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        responses = await asyncio.gather(
+            *(test_question_async(client, dataset_id, question) for question in questions),
+            return_exceptions=True
+        )
+    
+    for question, response in zip(questions, responses):
+        print_result(question, response)
+
+
+def read_questions(path: str) -> list:
+    """Questions from a file: one per line, skipping blanks and # comments."""
+    with open(path) as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Usage: python test_chat.py <dataset_id> \"Your question here\"")
+        print("       python test_chat.py <dataset_id> --file questions.txt")
         print("\nExample:")
         print('  python test_chat.py abc123 "How many records are in this dataset?"')
         sys.exit(1)
     
     dataset_id = sys.argv[1]
-    question = " ".join(sys.argv[2:])
-    
-    test_question(dataset_id, question)
-
-
+    if sys.argv[2] == "--file" and len(sys.argv) > 3:
+        asyncio.run(run_questions(dataset_id, read_questions(sys.argv[3])))
+    else:
+        run_question(dataset_id, " ".join(sys.argv[2:]))